@@ -0,0 +1,231 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from dxfeed_clee.candle import Candle
+from dxfeed_clee.event import EventType
+from dxfeed_clee.timeandsales import TimeAndSale
+from dxfeed_clee.trade import Trade
+from streamer import DXLinkStreamer, candle_symbol
+from utils import (
+    DEFAULT_CALENDAR,
+    MS_PER_DAY,
+    TradingCalendar,
+    interval_to_timedelta,
+)
+
+MS_PER_HOUR = 3_600_000
+
+
+@dataclass
+class Bar:
+    #: UTC start of the bar in milliseconds
+    start: int
+    #: UTC end (exclusive) of the bar in milliseconds
+    end: int
+    open: float
+    high: float
+    low: float
+    close: float
+    volume: int = 0
+    turnover: float = 0.0
+    bid_volume: int = 0
+    ask_volume: int = 0
+    count: int = 0
+    event_time: int = 0
+
+    def add(self, price: float, size: int, side: Optional[str], event_time: int):
+        if price > self.high:
+            self.high = price
+        if price < self.low:
+            self.low = price
+        self.close = price
+        self.volume += size
+        self.turnover += price * size
+        if side == "BUY":
+            self.ask_volume += size
+        elif side == "SELL":
+            self.bid_volume += size
+        self.count += 1
+        self.event_time = event_time
+
+
+@dataclass
+class _Interval:
+    name: str
+    step: int
+    bars: Dict[str, Bar] = field(default_factory=dict)
+
+
+class BarBuilder:
+    """
+    Builds OHLCV/VWAP bars for several intervals at once from a TimeAndSale
+    or Trade stream, doing constant work per tick. Closed bars are returned
+    as :class:`~dxfeed_clee.candle.Candle` events whose symbol carries the
+    interval, e.g. ``/ESZ24:XCME{=5m}``, so they can stand in for candle
+    subscriptions.
+
+    Bars are aligned to the session open of `calendar` in `exchange_tz`,
+    like :func:`~resample.resample_candles` does for stored candles.
+    """
+
+    def __init__(
+        self,
+        intervals: List[str],
+        calendar: Optional[TradingCalendar] = None,
+        exchange_tz: str = "America/Chicago",
+    ):
+        self.calendar = calendar or DEFAULT_CALENDAR
+        self._tz = ZoneInfo(exchange_tz)
+        self._intervals = [
+            _Interval(name, interval_to_timedelta(name) // timedelta(milliseconds=1))
+            for name in intervals
+        ]
+        self._offsets: Dict[int, int] = {}
+
+    def _offset(self, time_ms: int) -> int:
+        # UTC offsets only change on the hour, so one lookup per hour suffices
+        hour = time_ms // MS_PER_HOUR
+        offset = self._offsets.get(hour)
+        if offset is None:
+            utc = datetime.fromtimestamp(hour * 3600, timezone.utc)
+            offset = utc.astimezone(self._tz).utcoffset() // timedelta(milliseconds=1)
+            self._offsets[hour] = offset
+        return offset
+
+    def _bounds(self, time_ms: int, step: int) -> Optional[Tuple[int, int]]:
+        offset = self._offset(time_ms)
+        local = time_ms + offset
+        open_ms, close_ms = self.calendar.session_bounds_ms
+        session = (local - open_ms) // MS_PER_DAY
+        if local >= session * MS_PER_DAY + close_ms:
+            return None
+        if step >= MS_PER_DAY:
+            days = step // MS_PER_DAY
+            first = self.calendar.period_start(session, days)
+            start = first * MS_PER_DAY + open_ms
+            end = (first + days - 1) * MS_PER_DAY + close_ms
+        else:
+            session_open = session * MS_PER_DAY + open_ms
+            start = session_open + (local - session_open) // step * step
+            end = min(start + step, session * MS_PER_DAY + close_ms)
+        return start - offset, end - offset
+
+    def update(
+        self,
+        symbol: str,
+        time_ms: int,
+        price: float,
+        size: int,
+        side: Optional[str] = None,
+        event_time: int = 0,
+    ) -> List[Candle]:
+        """
+        Adds one trade to every interval and returns the bars it closed.
+        Trades outside the calendar's sessions or older than the open bar
+        are ignored.
+        """
+        closed = []
+        for interval in self._intervals:
+            bar = interval.bars.get(symbol)
+            if bar is not None and time_ms < bar.end:
+                if time_ms >= bar.start:
+                    bar.add(price, size, side, event_time)
+                continue
+            bounds = self._bounds(time_ms, interval.step)
+            if bounds is None:
+                continue
+            if bar is not None:
+                closed.append(self._to_candle(symbol, interval.name, bar))
+            bar = Bar(*bounds, price, price, price, price)
+            bar.add(price, size, side, event_time)
+            interval.bars[symbol] = bar
+        return closed
+
+    def on_tick(self, tick: TimeAndSale | Trade) -> List[Candle]:
+        if isinstance(tick, TimeAndSale):
+            if not tick.validTick or tick.type != "NEW":
+                return []
+            side = tick.aggressorSide
+        else:
+            if tick.price is None or not tick.size:
+                return []
+            side = None
+        return self.update(
+            tick.eventSymbol,
+            tick.time,
+            float(tick.price),
+            int(tick.size),
+            side,
+            tick.eventTime,
+        )
+
+    def close_due(self, now_ms: Optional[int] = None) -> List[Candle]:
+        """
+        Closes every bar whose end has passed, for symbols that stopped
+        trading before the next bar began.
+        """
+        now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+        closed = []
+        for interval in self._intervals:
+            for symbol, bar in list(interval.bars.items()):
+                if bar.end <= now_ms:
+                    closed.append(self._to_candle(symbol, interval.name, bar))
+                    del interval.bars[symbol]
+        return closed
+
+    def current(self, symbol: str, interval: str) -> Optional[Candle]:
+        for state in self._intervals:
+            if state.name == interval and symbol in state.bars:
+                return self._to_candle(symbol, interval, state.bars[symbol])
+        return None
+
+    def _to_candle(self, symbol: str, interval: str, bar: Bar) -> Candle:
+        return Candle(
+            eventSymbol=candle_symbol(symbol, interval),
+            eventTime=bar.event_time,
+            eventFlags=0,
+            index=(bar.start // 1000) << 32,
+            time=bar.start,
+            sequence=0,
+            count=bar.count,
+            open=bar.open,
+            high=bar.high,
+            low=bar.low,
+            close=bar.close,
+            volume=bar.volume,
+            vwap=bar.turnover / bar.volume if bar.volume else None,
+            bidVolume=bar.bid_volume,
+            askVolume=bar.ask_volume,
+        )
+
+    async def run(
+        self,
+        streamer: DXLinkStreamer,
+        event_type: EventType = EventType.TIME_AND_SALE,
+        close_interval: float = 1.0,
+    ) -> AsyncIterator[Candle]:
+        """
+        Consumes ticks of `event_type` from `streamer` and yields each bar
+        as it closes. Every `close_interval` seconds, whether or not ticks
+        keep arriving, bars whose end has passed are closed as well.
+        """
+        next_close = time.monotonic() + close_interval
+        while True:
+            try:
+                tick = await asyncio.wait_for(
+                    streamer.get_event(event_type),
+                    timeout=max(0, next_close - time.monotonic()),
+                )
+            except asyncio.TimeoutError:
+                pass
+            else:
+                for candle in self.on_tick(tick):
+                    yield candle
+            if time.monotonic() >= next_close:
+                next_close = time.monotonic() + close_interval
+                for candle in self.close_due():
+                    yield candle
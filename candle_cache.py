@@ -0,0 +1,192 @@
+import io
+import json
+import os
+import re
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from dxfeed_clee.columns import CANDLE_SCHEMA
+
+Range = Tuple[int, int]
+
+
+def _atomic_write(path: str, data: bytes) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def merge_ranges(ranges: List[Range]) -> List[Range]:
+    merged: List[List[int]] = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return [(start, end) for start, end in merged]
+
+
+def subtract_ranges(wanted: Range, covered: List[Range]) -> List[Range]:
+    missing = []
+    cursor, end = wanted
+    for c_start, c_end in merge_ranges(covered):
+        if c_end < cursor or c_start > end:
+            continue
+        if c_start > cursor:
+            missing.append((cursor, c_start))
+        cursor = max(cursor, c_end)
+        if cursor >= end:
+            break
+    if cursor < end:
+        missing.append((cursor, end))
+    return missing
+
+
+class CandleCache:
+    """
+    On-disk candle store keyed by streamer symbol, interval and the
+    extended-trading-hours flag.
+
+    Every key is a directory of append-only ``.npz`` chunks (one array per
+    candle field, times in UTC milliseconds) plus a ``meta.json`` holding the
+    chunk list and the time ranges known to be complete. A chunk is fully
+    written and fsynced before ``meta.json`` is atomically replaced to point
+    at it, so an interrupted backfill leaves the cache consistent and the
+    next run only fetches what is still missing.
+    """
+
+    def __init__(self, root: str):
+        #: directory holding one sub-directory per cached key
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _key_dir(self, symbol: str, interval: str, extended_trading_hours: bool) -> str:
+        name = re.sub(r"[^A-Za-z0-9._-]", "_", symbol.lstrip("/"))
+        session = "tho" if extended_trading_hours else "rth"
+        return os.path.join(self.root, name, f"{interval}-{session}")
+
+    def _read_meta(self, key_dir: str) -> Dict:
+        try:
+            with open(os.path.join(key_dir, "meta.json")) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {"chunks": [], "coverage": []}
+
+    def _write_meta(self, key_dir: str, meta: Dict) -> None:
+        _atomic_write(os.path.join(key_dir, "meta.json"), json.dumps(meta).encode())
+
+    def _write_chunk(self, key_dir: str, columns: Dict[str, np.ndarray]) -> str:
+        chunk = f"chunk-{time.time_ns()}.npz"
+        buffer = io.BytesIO()
+        np.savez(
+            buffer, **{name: columns[name] for name in CANDLE_SCHEMA if name in columns}
+        )
+        _atomic_write(os.path.join(key_dir, chunk), buffer.getvalue())
+        return chunk
+
+    def coverage(
+        self, symbol: str, interval: str, extended_trading_hours: bool = True
+    ) -> List[Range]:
+        meta = self._read_meta(self._key_dir(symbol, interval, extended_trading_hours))
+        return [tuple(r) for r in meta["coverage"]]
+
+    def missing(
+        self,
+        symbol: str,
+        interval: str,
+        start_ms: int,
+        end_ms: int,
+        extended_trading_hours: bool = True,
+    ) -> List[Range]:
+        """
+        Returns the parts of ``[start_ms, end_ms]`` not yet covered on disk.
+        """
+        covered = self.coverage(symbol, interval, extended_trading_hours)
+        return subtract_ranges((start_ms, end_ms), covered)
+
+    def append(
+        self,
+        symbol: str,
+        interval: str,
+        columns: Dict[str, np.ndarray],
+        covered: Optional[Range] = None,
+        extended_trading_hours: bool = True,
+    ) -> None:
+        """
+        Appends a chunk of candle columns and marks `covered` as complete.
+        Either may be empty: a fetch that returned nothing for a range can
+        still record the range as covered.
+        """
+        key_dir = self._key_dir(symbol, interval, extended_trading_hours)
+        os.makedirs(key_dir, exist_ok=True)
+        meta = self._read_meta(key_dir)
+        if len(columns.get("time", ())):
+            meta["chunks"].append(self._write_chunk(key_dir, columns))
+        if covered is not None:
+            meta["coverage"] = merge_ranges(
+                [tuple(r) for r in meta["coverage"]] + [covered]
+            )
+        self._write_meta(key_dir, meta)
+
+    def read(
+        self,
+        symbol: str,
+        interval: str,
+        start_ms: Optional[int] = None,
+        end_ms: Optional[int] = None,
+        extended_trading_hours: bool = True,
+    ) -> Dict[str, np.ndarray]:
+        """
+        Returns the cached candles in ``[start_ms, end_ms]`` sorted by time.
+        When a candle was stored more than once the latest write wins.
+        """
+        key_dir = self._key_dir(symbol, interval, extended_trading_hours)
+        chunks = []
+        for chunk in self._read_meta(key_dir)["chunks"]:
+            with np.load(os.path.join(key_dir, chunk)) as data:
+                chunks.append({name: data[name] for name in data.files})
+        if not chunks:
+            return {
+                name: np.empty(0, dtype=dtype)
+                for name, dtype in CANDLE_SCHEMA.items()
+                if name != "eventSymbol"
+            }
+
+        columns = {
+            name: np.concatenate([chunk[name] for chunk in chunks])
+            for name in chunks[0]
+        }
+        # last write wins: unique over the reversed times keeps the newest row
+        times = columns["time"][::-1]
+        _, last = np.unique(times, return_index=True)
+        order = len(times) - 1 - last
+        columns = {name: values[order] for name, values in columns.items()}
+
+        mask = np.ones(len(order), dtype=bool)
+        if start_ms is not None:
+            mask &= columns["time"] >= start_ms
+        if end_ms is not None:
+            mask &= columns["time"] <= end_ms
+        return {name: values[mask] for name, values in columns.items()}
+
+    def compact(
+        self, symbol: str, interval: str, extended_trading_hours: bool = True
+    ) -> None:
+        """
+        Rewrites all chunks of a key into a single deduplicated chunk.
+        """
+        key_dir = self._key_dir(symbol, interval, extended_trading_hours)
+        meta = self._read_meta(key_dir)
+        if len(meta["chunks"]) < 2:
+            return
+        columns = self.read(symbol, interval, None, None, extended_trading_hours)
+        old_chunks = meta["chunks"]
+        meta["chunks"] = [self._write_chunk(key_dir, columns)]
+        self._write_meta(key_dir, meta)
+        for chunk in old_chunks:
+            os.remove(os.path.join(key_dir, chunk))
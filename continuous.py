@@ -0,0 +1,168 @@
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from dxfeed_clee.columns import NA_INT
+from dxfeed_clee.futures import cme_contract_code_to_datetime
+from session import TastytradeError
+from utils import MS_PER_DAY
+
+ROLL_RULES = ("calendar", "volume", "open_interest")
+ADJUSTMENTS = ("back", "ratio", None)
+
+
+@dataclass
+class ContinuousSeries:
+    #: candle times in UTC milliseconds
+    time: np.ndarray
+    #: adjusted series per field, e.g. ``close``
+    prices: Dict[str, np.ndarray]
+    #: unadjusted series per field
+    raw_prices: Dict[str, np.ndarray]
+    #: index into `contracts` of the contract each row is taken from
+    contract: np.ndarray
+    #: contracts in expiry order
+    contracts: List[str]
+    #: one row per roll: time, from/to contract, gap (back) or ratio
+    rolls: pd.DataFrame
+
+    def to_frame(self) -> pd.DataFrame:
+        df = pd.DataFrame(self.prices, index=pd.to_datetime(self.time, unit="ms"))
+        df["contract"] = np.asarray(self.contracts, dtype=object)[self.contract]
+        return df
+
+
+def expirations_from_instruments(items: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Maps streamer symbol to ``expiration-date`` for instrument dicts as
+    returned by :func:`~dxfeed_clee.futures.get_futures`.
+    """
+    return {
+        item["streamer-symbol"]: np.datetime64(item["expiration-date"], "ms")
+        for item in items
+    }
+
+
+def _scatter(
+    time_axis: np.ndarray,
+    candles: Dict[str, Dict[str, np.ndarray]],
+    contracts: List[str],
+    field: str,
+    fill: Any,
+) -> np.ndarray:
+    dtype = candles[contracts[0]][field].dtype
+    matrix = np.full((len(time_axis), len(contracts)), fill, dtype=dtype)
+    for j, contract in enumerate(contracts):
+        columns = candles[contract]
+        matrix[np.searchsorted(time_axis, columns["time"]), j] = columns[field]
+    return matrix
+
+
+def build_continuous(
+    candles: Dict[str, Dict[str, np.ndarray]],
+    roll: str = "calendar",
+    adjustment: Optional[str] = "back",
+    expirations: Optional[Dict[str, Any]] = None,
+    roll_days: int = 5,
+    fields: Sequence[str] = ("open", "high", "low", "close"),
+) -> ContinuousSeries:
+    """
+    Stitches per-contract candle columns (keyed by streamer symbol) into one
+    continuous series, in a single pass over (time, contract) matrices.
+
+    `roll` picks the contract held on every row:
+
+    - ``calendar``: roll `roll_days` days before each contract's expiry
+    - ``volume`` / ``open_interest``: roll to the next contract once its
+      volume / open interest exceeds the held contract's
+
+    Rolls only move forward. `adjustment` removes the roll gaps from the
+    history before each roll, either additively (``back``) or
+    multiplicatively (``ratio``); ``None`` leaves prices raw. Expiries come
+    from `expirations` (see :func:`expirations_from_instruments`) or, by
+    default, the first day of the contract month.
+    """
+    if roll not in ROLL_RULES:
+        raise TastytradeError(f"Unknown roll rule: {roll}")
+    if adjustment not in ADJUSTMENTS:
+        raise TastytradeError(f"Unknown adjustment: {adjustment}")
+
+    contracts = [symbol for symbol in candles if len(candles[symbol]["time"])]
+    if not contracts:
+        raise TastytradeError("No candles to build a continuous series from")
+    expirations = expirations or {}
+    expiry = np.array(
+        [expirations.get(c, cme_contract_code_to_datetime(c)) for c in contracts],
+        dtype="datetime64[ms]",
+    ).view(np.int64)
+    order = np.argsort(expiry, kind="stable")
+    contracts = [contracts[i] for i in order]
+    expiry = expiry[order]
+
+    time_axis = np.unique(np.concatenate([candles[c]["time"] for c in contracts]))
+    rows = np.arange(len(time_axis))
+    last = len(contracts) - 1
+    matrices = {
+        name: _scatter(time_axis, candles, contracts, name, np.nan)
+        for name in dict.fromkeys([*fields, "close"])
+    }
+    close = matrices["close"]
+
+    if roll == "calendar":
+        roll_at = expiry - roll_days * MS_PER_DAY
+        active = np.searchsorted(roll_at, time_axis, side="right")
+    else:
+        field = "volume" if roll == "volume" else "openInterest"
+        metric = _scatter(time_axis, candles, contracts, field, NA_INT)
+        metric = np.where(metric == NA_INT, -1, metric)
+        front = np.minimum(np.searchsorted(expiry, time_axis, side="right"), last)
+        following = np.minimum(front + 1, last)
+        active = front + (metric[rows, following] > metric[rows, front])
+    active = np.maximum.accumulate(np.minimum(active, last))
+
+    roll_rows = np.flatnonzero(np.diff(active)) + 1
+    old, new = active[roll_rows - 1], active[roll_rows]
+    old_price = close[roll_rows, old]
+    # the held contract may not have printed on the roll row itself
+    stale = np.isnan(old_price)
+    old_price[stale] = close[roll_rows[stale] - 1, old[stale]]
+    new_price = close[roll_rows, new]
+
+    segment = np.searchsorted(roll_rows, rows, side="right")
+    raw_prices = {name: matrices[name][rows, active] for name in fields}
+    if adjustment == "back":
+        gaps = np.nan_to_num(new_price - old_price)
+        offset = np.r_[np.cumsum(gaps[::-1])[::-1], 0.0][segment]
+        prices = {name: values + offset for name, values in raw_prices.items()}
+        change = gaps
+    elif adjustment == "ratio":
+        with np.errstate(invalid="ignore", divide="ignore"):
+            ratios = new_price / old_price
+        ratios = np.where(np.isfinite(ratios), ratios, 1.0)
+        factor = np.r_[np.cumprod(ratios[::-1])[::-1], 1.0][segment]
+        prices = {name: values * factor for name, values in raw_prices.items()}
+        change = ratios
+    else:
+        prices = raw_prices
+        change = new_price - old_price
+
+    rolls = pd.DataFrame(
+        {
+            "time": pd.to_datetime(time_axis[roll_rows], unit="ms"),
+            "from": np.asarray(contracts, dtype=object)[old],
+            "to": np.asarray(contracts, dtype=object)[new],
+            "old_price": old_price,
+            "new_price": new_price,
+            "adjustment": change,
+        }
+    )
+    return ContinuousSeries(
+        time=time_axis,
+        prices=prices,
+        raw_prices=raw_prices,
+        contract=active,
+        contracts=contracts,
+        rolls=rolls,
+    )
@@ -0,0 +1,281 @@
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from dxfeed_clee.columns import NA_INT
+from dxfeed_clee.contracts import CONTRACTS
+from dxfeed_clee.event import EventType
+from dxfeed_clee.futures import (
+    a_get_all_streamer_symbols,
+    cme_contract_code_to_datetime,
+    sort_cme_contracts,
+)
+from session import Session
+from streamer import DXLinkStreamer
+from utils import MS_PER_DAY, to_exchange_time
+
+
+class CurveMatrix:
+    """
+    Forward-curve history as one preallocated 2-D float64 array indexed by
+    (date, contract), with contracts in maturity order and NaN where a
+    contract has no value on a date.
+    """
+
+    def __init__(
+        self,
+        contracts: List[str],
+        dates: np.ndarray,
+        maturities: Optional[np.ndarray] = None,
+    ):
+        # symbols that are not futures contracts (e.g. ``SPY``) go last
+        contracts = list(contracts)
+        #: contract codes in maturity order, e.g. ``/CLZ23``
+        self.contracts = sort_cme_contracts(
+            [c for c in contracts if CONTRACTS.find(c)]
+        ) + [c for c in contracts if not CONTRACTS.find(c)]
+        #: sorted row axis as datetime64[ms]
+        self.dates = np.asarray(dates, dtype="datetime64[ms]")
+        #: maturity of every contract; the contract month if not given, NaT
+        #: for other symbols
+        # given maturities follow `contracts`, so reorder them the same way
+        position = {contract: i for i, contract in enumerate(contracts)}
+        order = [position[contract] for contract in self.contracts]
+        self.maturities = (
+            np.asarray(maturities, dtype="datetime64[ms]")[order]
+            if maturities is not None
+            else np.array(
+                [
+                    contract.month_start if (contract := CONTRACTS.find(c)) else None
+                    for c in self.contracts
+                ],
+                dtype="datetime64[ms]",
+            )
+        )
+        #: curve values, shape ``(len(dates), len(contracts))``
+        self.values = np.full((len(self.dates), len(self.contracts)), np.nan)
+        self._columns = {contract: i for i, contract in enumerate(self.contracts)}
+
+    @classmethod
+    def from_candles(
+        cls,
+        candles: Dict[str, Dict[str, np.ndarray]],
+        value_key: str = "close",
+        exchange_tz: str = "America/Chicago",
+    ) -> "CurveMatrix":
+        """
+        Builds the matrix from candle columns keyed by streamer symbol. Rows
+        are the distinct candle times (exchange time, whole seconds) across
+        all contracts.
+        """
+        times = {
+            symbol: to_exchange_time(columns["time"], exchange_tz) // 1000 * 1000
+            for symbol, columns in candles.items()
+        }
+        dates = np.unique(np.concatenate(list(times.values()) or [[]])).astype(
+            np.int64
+        )
+        codes = {symbol: CONTRACTS.code(symbol) for symbol in candles}
+        matrix = cls(list(codes.values()), dates)
+        for symbol, columns in candles.items():
+            matrix.fill(codes[symbol], times[symbol], columns[value_key])
+        return matrix
+
+    def fill(self, contract: str, times: np.ndarray, values: np.ndarray) -> None:
+        """
+        Writes one contract's values at `times` (ms, on the row axis) with a
+        single scattered assignment; later values win on duplicate times.
+        Missing integer values (volume, openInterest) become NaN.
+        """
+        if values.dtype.kind in "iu":
+            values = np.where(values == NA_INT, np.nan, values)
+        rows = np.searchsorted(self.dates.view(np.int64), times)
+        self.values[rows, self._columns[contract]] = values
+
+    def nearby(self, n: int = 1) -> np.ndarray:
+        """
+        Returns the n-th nearby series (1 = front month): on every date, the
+        value of the n-th contract in maturity order that has a value.
+        """
+        valid = ~np.isnan(self.values)
+        hit = valid & (np.cumsum(valid, axis=1) == n)
+        column = np.argmax(hit, axis=1)
+        series = self.values[np.arange(len(self.dates)), column]
+        return np.where(hit.any(axis=1), series, np.nan)
+
+    def nearby_contracts(self, n: int = 1) -> np.ndarray:
+        """
+        Returns the index into :attr:`contracts` of the n-th nearby contract
+        on every date, or -1 where there is none.
+        """
+        valid = ~np.isnan(self.values)
+        hit = valid & (np.cumsum(valid, axis=1) == n)
+        return np.where(hit.any(axis=1), np.argmax(hit, axis=1), -1)
+
+    def constant_maturity(self, days: float) -> np.ndarray:
+        """
+        Interpolates linearly along every curve to a point `days` ahead of
+        the date, using only contracts with a value. Dates where the point
+        is not bracketed by two contracts give NaN.
+        """
+        tenor = (
+            self.maturities.view(np.int64)[None, :]
+            - self.dates.view(np.int64)[:, None]
+        ) / MS_PER_DAY
+        valid = ~np.isnan(self.values) & ~np.isnat(self.maturities)[None, :]
+        rows = np.arange(len(self.dates))
+        last = self.values.shape[1] - 1
+
+        below = valid & (tenor <= days)
+        lo = last - np.argmax(below[:, ::-1], axis=1)
+        above = valid & (tenor >= days)
+        hi = np.argmax(above, axis=1)
+
+        lo_tenor, hi_tenor = tenor[rows, lo], tenor[rows, hi]
+        lo_value, hi_value = self.values[rows, lo], self.values[rows, hi]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            weight = np.where(
+                hi_tenor > lo_tenor, (days - lo_tenor) / (hi_tenor - lo_tenor), 0.0
+            )
+        series = lo_value + weight * (hi_value - lo_value)
+        return np.where(below.any(axis=1) & above.any(axis=1), series, np.nan)
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame(
+            self.values, index=pd.DatetimeIndex(self.dates), columns=self.contracts
+        )
+
+
+class ForwardCurve:
+    """
+    Live curve of one futures root kept in maturity-sorted NumPy vectors
+    (bid, ask, mid) that are updated in place on every Quote. Calendar
+    spreads, roll yields and slopes between neighbouring tenors are
+    maintained incrementally: a quote only touches the two pairs around its
+    contract.
+
+    Attach it with :meth:`start`; quotes are then fed straight from the
+    decoded messages through :meth:`append`, without Quote objects.
+    """
+
+    def __init__(
+        self,
+        symbols: List[str],
+        maturities: Optional[np.ndarray] = None,
+        price: str = "mid",
+    ):
+        if maturities is None:
+            maturities = np.array(
+                [cme_contract_code_to_datetime(s) for s in symbols],
+                dtype="datetime64[ms]",
+            )
+        maturities = np.asarray(maturities, dtype="datetime64[ms]")
+        order = np.argsort(maturities, kind="stable")
+        #: streamer symbols in maturity order
+        self.symbols: List[str] = [symbols[i] for i in order]
+        self.maturities = maturities[order]
+        n = len(self.symbols)
+        self.bid = np.full(n, np.nan)
+        self.ask = np.full(n, np.nan)
+        self.mid = np.full(n, np.nan)
+        #: price of tenor i+1 minus price of tenor i
+        self.spreads = np.full(max(n - 1, 0), np.nan)
+        #: annualized log roll yield from tenor i+1 into tenor i
+        self.roll_yields = np.full(max(n - 1, 0), np.nan)
+        #: spread per day between neighbouring tenors
+        self.slopes = np.full(max(n - 1, 0), np.nan)
+        self._gap_days = np.diff(self.maturities).astype(np.int64) / MS_PER_DAY
+        self._index = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self._price = {"mid": self.mid, "bid": self.bid, "ask": self.ask}[price]
+        self._updates = 0
+        self._streamer: Optional[DXLinkStreamer] = None
+
+    def __len__(self) -> int:
+        return self._updates
+
+    @classmethod
+    async def create(
+        cls,
+        session: Session,
+        streamer: DXLinkStreamer,
+        contract_code: str,
+        price: str = "mid",
+    ) -> "ForwardCurve":
+        """
+        Builds the curve of every listed contract of `contract_code` and
+        starts it on `streamer`.
+        """
+        symbols = list(
+            (
+                await a_get_all_streamer_symbols(
+                    session=session, future_contract_code=contract_code
+                )
+            ).values()
+        )
+        curve = cls(symbols, price=price)
+        await curve.start(streamer)
+        return curve
+
+    async def start(self, streamer: DXLinkStreamer) -> None:
+        self._streamer = streamer
+        streamer.attach_accumulator(EventType.QUOTE, self)
+        await streamer.subscribe(EventType.QUOTE, self.symbols)
+
+    async def stop(self) -> None:
+        if self._streamer is not None:
+            self._streamer.detach_accumulator(EventType.QUOTE)
+            await self._streamer.unsubscribe_quote(self.symbols)
+            self._streamer = None
+
+    def _update_pair(self, i: int) -> None:
+        near, far = self._price[i], self._price[i + 1]
+        self.spreads[i] = far - near
+        gap = self._gap_days[i]
+        if gap > 0:
+            self.slopes[i] = (far - near) / gap
+            with np.errstate(invalid="ignore", divide="ignore"):
+                self.roll_yields[i] = np.log(near / far) * 365.0 / gap
+
+    def update(self, symbol: str, bid: float, ask: float) -> Optional[int]:
+        """
+        Applies one quote and returns the tenor it updated, if any.
+        """
+        i = self._index.get(symbol)
+        if i is None:
+            return None
+        self.bid[i] = bid
+        self.ask[i] = ask
+        self.mid[i] = (bid + ask) / 2
+        if i > 0:
+            self._update_pair(i - 1)
+        if i < len(self.spreads):
+            self._update_pair(i)
+        self._updates += 1
+        return i
+
+    def append(self, item: Dict) -> None:
+        bid, ask = item.get("bidPrice"), item.get("askPrice")
+        self.update(
+            item["eventSymbol"],
+            np.nan if bid in (None, "NaN") else float(bid),
+            np.nan if ask in (None, "NaN") else float(ask),
+        )
+
+    def on_quote(self, quote) -> Optional[int]:
+        return self.update(
+            quote.eventSymbol,
+            np.nan if quote.bidPrice is None else float(quote.bidPrice),
+            np.nan if quote.askPrice is None else float(quote.askPrice),
+        )
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame(
+            {
+                "maturity": self.maturities,
+                "bid": self.bid,
+                "ask": self.ask,
+                "mid": self.mid,
+            },
+            index=self.symbols,
+        )
@@ -0,0 +1,302 @@
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterator, List, Optional, Type, get_args
+
+import numpy as np
+import pandas as pd
+
+from .candle import Candle
+from .event import Event, EventType
+from .quote import Quote
+from .summary import Summary
+from .timeandsales import TimeAndSale
+from .trade import Trade
+
+#: stored in integer columns when the feed sends ``NaN`` or null
+NA_INT = np.iinfo(np.int64).min
+
+
+def _field_dtype(annotation: Any) -> np.dtype:
+    args = [arg for arg in get_args(annotation) if arg is not type(None)]
+    field_type = args[0] if args else annotation
+    if field_type is bool:
+        return np.dtype(np.bool_)
+    if field_type is int:
+        return np.dtype(np.int64)
+    if field_type in (Decimal, float):
+        return np.dtype(np.float64)
+    return np.dtype(object)
+
+
+def event_schema(model: Type[Event]) -> Dict[str, np.dtype]:
+    """
+    Maps every field of an event model to the NumPy dtype used to store it
+    in columnar form: ints become int64, prices (Decimal) become float64,
+    bools stay bool and everything else is kept as Python objects.
+    """
+    return {
+        name: _field_dtype(field.annotation)
+        for name, field in model.model_fields.items()
+    }
+
+
+def coerce_value(value: Any, dtype: np.dtype) -> Any:
+    if dtype.kind == "f":
+        if value is None or value == "NaN":
+            return np.nan
+        return float(value)
+    if dtype.kind == "i":
+        if value is None or value == "NaN" or value != value:
+            return NA_INT
+        return int(value)
+    if dtype.kind == "b":
+        return bool(value)
+    if dtype.kind == "S":
+        return b"" if value is None else str(value).encode()[: dtype.itemsize]
+    return value
+
+
+class ColumnBuffer:
+    """
+    A typed NumPy array that grows geometrically as values are appended.
+    :meth:`view` returns the filled part of the array without copying it.
+    """
+
+    def __init__(self, dtype: np.dtype, capacity: int = 1024):
+        self.dtype = np.dtype(dtype)
+        self._data = np.empty(max(capacity, 1), dtype=self.dtype)
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _reserve(self, capacity: int) -> None:
+        if capacity <= len(self._data):
+            return
+        data = np.empty(max(capacity, 2 * len(self._data)), dtype=self.dtype)
+        data[: self._size] = self._data[: self._size]
+        self._data = data
+
+    def append(self, value: Any) -> None:
+        if self._size == len(self._data):
+            self._reserve(self._size + 1)
+        self._data[self._size] = value
+        self._size += 1
+
+    def extend(self, values: np.ndarray) -> None:
+        self._reserve(self._size + len(values))
+        self._data[self._size : self._size + len(values)] = values
+        self._size += len(values)
+
+    def view(self) -> np.ndarray:
+        return self._data[: self._size]
+
+    def clear(self) -> None:
+        self._size = 0
+
+
+def column_to_series(name: str, values: np.ndarray) -> Any:
+    if name == "time" and values.dtype == np.int64:
+        return values.view("datetime64[ms]")
+    if values.dtype == np.int64:
+        missing = values == NA_INT
+        if missing.any():
+            return pd.arrays.IntegerArray(values, missing)
+    return values
+
+
+def items_to_columns(
+    items: List[Dict[str, Any]], schema: Dict[str, np.dtype]
+) -> Dict[str, np.ndarray]:
+    """
+    Decodes a list of raw events of one type into one array per field of
+    `schema`, with the same coercions as :meth:`EventAccumulator.append`.
+    """
+    return {
+        name: np.fromiter(
+            (coerce_value(item.get(name), dtype) for item in items),
+            dtype=dtype,
+            count=len(items),
+        )
+        for name, dtype in schema.items()
+    }
+
+
+def columns_to_frame(columns: Dict[str, np.ndarray]) -> pd.DataFrame:
+    return pd.DataFrame(
+        {name: column_to_series(name, values) for name, values in columns.items()},
+        copy=False,
+    )
+
+
+def columns_to_arrow(columns: Dict[str, np.ndarray]):
+    import pyarrow as pa
+
+    arrays = []
+    for name, values in columns.items():
+        if name == "time" and values.dtype == np.int64:
+            arrays.append(pa.array(values.view("datetime64[ms]")))
+        elif values.dtype == np.int64:
+            arrays.append(pa.array(values, mask=values == NA_INT))
+        elif values.dtype == np.float64:
+            arrays.append(pa.array(values, from_pandas=True))
+        else:
+            arrays.append(pa.array(values))
+    return pa.RecordBatch.from_arrays(arrays, names=list(columns))
+
+
+class EventAccumulator:
+    """
+    Collects raw events from the streamer into one growable typed column per
+    field and per symbol, so no pydantic object or dict is kept per event.
+    """
+
+    def __init__(
+        self,
+        schema: Dict[str, np.dtype],
+        fields: Optional[List[str]] = None,
+        capacity: int = 1024,
+    ):
+        #: dtype of every stored field; the symbol is the key, not a column
+        self.schema: Dict[str, np.dtype] = {
+            name: dtype
+            for name, dtype in schema.items()
+            if name != "eventSymbol" and (fields is None or name in fields)
+        }
+        self._capacity = capacity
+        self._columns: Dict[str, Dict[str, ColumnBuffer]] = {}
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._columns)
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self._columns
+
+    @property
+    def symbols(self) -> List[str]:
+        return list(self._columns)
+
+    def _add_symbol(self, symbol: str) -> Dict[str, ColumnBuffer]:
+        columns = {
+            name: ColumnBuffer(dtype, self._capacity)
+            for name, dtype in self.schema.items()
+        }
+        self._columns[symbol] = columns
+        return columns
+
+    def append(self, item: Dict[str, Any]) -> None:
+        symbol = item["eventSymbol"]
+        columns = self._columns.get(symbol)
+        if columns is None:
+            columns = self._add_symbol(symbol)
+        for name, column in columns.items():
+            column.append(coerce_value(item.get(name), column.dtype))
+        self._count += 1
+
+    def clear(self) -> None:
+        """
+        Empties every column but keeps the allocated arrays for reuse. The
+        length still counts every event ever appended.
+        """
+        for columns in self._columns.values():
+            for column in columns.values():
+                column.clear()
+
+    def arrays(self, symbol: str) -> Dict[str, np.ndarray]:
+        return {name: column.view() for name, column in self._columns[symbol].items()}
+
+    def to_frame(self, symbol: str) -> pd.DataFrame:
+        return columns_to_frame(self.arrays(symbol))
+
+    def to_arrow(self, symbol: str):
+        return columns_to_arrow(self.arrays(symbol))
+
+
+#: column dtypes of a :class:`~dxfeed_clee.candle.Candle`
+CANDLE_SCHEMA: Dict[str, np.dtype] = event_schema(Candle)
+
+#: column dtypes of every event type that can be decoded into columns
+EVENT_SCHEMAS: Dict[EventType, Dict[str, np.dtype]] = {
+    EventType.CANDLE: CANDLE_SCHEMA,
+    EventType.QUOTE: event_schema(Quote),
+    EventType.SUMMARY: event_schema(Summary),
+    EventType.TIME_AND_SALE: event_schema(TimeAndSale),
+    EventType.TRADE: event_schema(Trade),
+}
+
+
+class CandleAccumulator(EventAccumulator):
+    """
+    Columnar candle store: time as int64 milliseconds, OHLC/vwap as float64
+    and volumes/open interest as int64, one set of arrays per symbol.
+    """
+
+    def __init__(self, fields: Optional[List[str]] = None, capacity: int = 1024):
+        super().__init__(CANDLE_SCHEMA, fields=fields, capacity=capacity)
+
+
+class SnapshotTable:
+    """
+    One preallocated row per requested symbol, filled in place by the first
+    event of that symbol; later events are ignored. It has the accumulator
+    interface, so the streamer writes into it straight from the decoded
+    message, and `on_complete` is called once every symbol has a row.
+    """
+
+    def __init__(
+        self,
+        schema: Dict[str, np.dtype],
+        symbols: List[str],
+        on_complete: Optional[Callable[[], None]] = None,
+    ):
+        #: requested symbols, in row order
+        self.symbols: List[str] = list(dict.fromkeys(symbols))
+        self.schema: Dict[str, np.dtype] = {
+            name: dtype for name, dtype in schema.items() if name != "eventSymbol"
+        }
+        #: one array per field, NaN / NA_INT / None where no event came
+        self.columns: Dict[str, np.ndarray] = {
+            name: np.full(len(self.symbols), coerce_value(None, dtype), dtype=dtype)
+            for name, dtype in self.schema.items()
+        }
+        #: whether each row has been filled
+        self.filled = np.zeros(len(self.symbols), dtype=np.bool_)
+        #: first raw event of every filled symbol
+        self.items: Dict[str, Dict[str, Any]] = {}
+        self._rows = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self._on_complete = on_complete
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    @property
+    def complete(self) -> bool:
+        return len(self.items) == len(self.symbols)
+
+    @property
+    def missing(self) -> List[str]:
+        return [self.symbols[i] for i in np.flatnonzero(~self.filled)]
+
+    def append(self, item: Dict[str, Any]) -> None:
+        symbol = item["eventSymbol"]
+        row = self._rows.get(symbol)
+        if row is None or self.filled[row]:
+            return
+        for name, values in self.columns.items():
+            values[row] = coerce_value(item.get(name), values.dtype)
+        self.filled[row] = True
+        self.items[symbol] = item
+        if self._on_complete is not None and self.complete:
+            self._on_complete()
+
+    def to_frame(self, dropna: bool = False) -> pd.DataFrame:
+        """
+        Returns one row per symbol, indexed by symbol; `dropna` leaves out
+        the symbols that never sent an event.
+        """
+        df = columns_to_frame(self.columns)
+        df.index = pd.Index(self.symbols, name="eventSymbol")
+        return df[self.filled] if dropna else df
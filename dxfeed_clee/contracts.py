@@ -0,0 +1,152 @@
+import re
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from session import TastytradeError
+
+#: CME month codes, January to December
+MONTH_CODES = "FGHJKMNQUVXZ"
+
+_CONTRACT_RE = re.compile(
+    r"^/?(?P<root>[A-Z0-9]+?)(?P<month>[FGHJKMNQUVXZ])(?P<year>\d{1,2})"
+    r"(?::(?P<exchange>[A-Z0-9]+))?$"
+)
+
+
+@dataclass(frozen=True)
+class Contract:
+    #: dense id, in registration order
+    id: int
+    #: contract code with the slash, e.g. ``/CLZ24``
+    code: str
+    #: product code, e.g. ``CL``
+    root: str
+    #: contract month, 1-12
+    month: int
+    #: four-digit contract year
+    year: int
+    #: streamer exchange code, e.g. ``XNYM``, if the symbol had one
+    exchange: Optional[str]
+
+    @property
+    def month_start(self) -> datetime:
+        return datetime(self.year, self.month, 1)
+
+    @property
+    def streamer_symbol(self) -> str:
+        return f"{self.code}:{self.exchange}" if self.exchange else self.code
+
+
+def _full_year(digits: str) -> int:
+    if len(digits) == 2:
+        return 2000 + int(digits)
+    # one-digit years (``/CLZ4``) are taken within the listing horizon
+    now = datetime.now().year
+    year = now - now % 10 + int(digits)
+    return year + 10 if year < now - 1 else year
+
+
+class ContractRegistry:
+    """
+    Interns futures symbols: every distinct spelling (``/CLZ24``,
+    ``/CLZ24:XNYM``, ``/CLZ24:XNYM{=1d}``) is parsed once, and later
+    lookups are a single dict access returning the shared
+    :class:`Contract`. Contracts get dense integer ids, so hot loops can
+    index arrays by id, and their maturity keys are kept in an array so
+    sorting never re-parses codes.
+    """
+
+    def __init__(self):
+        self._by_symbol: Dict[str, Contract] = {}
+        self._by_code: Dict[str, Contract] = {}
+        self._contracts: List[Contract] = []
+        self._maturity = np.empty(0, dtype=np.int64)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._contracts)
+
+    def __getitem__(self, contract_id: int) -> Contract:
+        return self._contracts[contract_id]
+
+    def get(self, symbol: str) -> Contract:
+        """
+        Returns the contract of a code, streamer symbol or candle symbol,
+        registering it on first sight.
+        """
+        contract = self._by_symbol.get(symbol)
+        if contract is None:
+            contract = self._intern(symbol)
+        return contract
+
+    def _intern(self, symbol: str) -> Contract:
+        match = _CONTRACT_RE.match(symbol.split("{")[0])
+        if match is None:
+            raise TastytradeError(f"Not a futures contract symbol: {symbol}")
+        code = f"/{match['root']}{match['month']}{match['year']}"
+        with self._lock:
+            contract = self._by_code.get(code)
+            if contract is None or (match["exchange"] and not contract.exchange):
+                contract = Contract(
+                    id=contract.id if contract else len(self._contracts),
+                    code=code,
+                    root=match["root"],
+                    month=MONTH_CODES.index(match["month"]) + 1,
+                    year=_full_year(match["year"]),
+                    exchange=match["exchange"],
+                )
+                if contract.id == len(self._contracts):
+                    self._contracts.append(contract)
+                    self._maturity = np.append(
+                        self._maturity, contract.year * 12 + contract.month - 1
+                    )
+                else:
+                    # the code was first seen without its exchange
+                    old = self._contracts[contract.id]
+                    self._contracts[contract.id] = contract
+                    for key, value in self._by_symbol.items():
+                        if value is old:
+                            self._by_symbol[key] = contract
+                self._by_code[code] = contract
+            self._by_symbol[symbol] = contract
+        return contract
+
+    def find(self, symbol: str) -> Optional[Contract]:
+        """
+        Like :meth:`get`, but returns None for symbols that are not futures
+        contracts, e.g. ``SPY``.
+        """
+        try:
+            return self.get(symbol)
+        except TastytradeError:
+            return None
+
+    def code(self, symbol: str) -> str:
+        """
+        Returns the contract code of `symbol`, or the part before the
+        exchange for symbols that are not futures contracts.
+        """
+        contract = self.find(symbol)
+        return contract.code if contract else symbol.split(":")[0]
+
+    def ids(self, symbols: Iterable[str]) -> np.ndarray:
+        return np.fromiter((self.get(s).id for s in symbols), dtype=np.int64)
+
+    def maturity_order(self, symbols: List[str]) -> np.ndarray:
+        """
+        Returns the indices that sort `symbols` by contract month.
+        """
+        ids = self.ids(symbols)  # may register symbols and grow the keys
+        return np.argsort(self._maturity[ids], kind="stable")
+
+    def sort(self, symbols: Iterable[str]) -> List[str]:
+        symbols = list(symbols)
+        return [symbols[i] for i in self.maturity_order(symbols)]
+
+
+#: registry shared by the futures helpers and the curve code
+CONTRACTS = ContractRegistry()
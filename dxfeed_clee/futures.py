@@ -1,11 +1,14 @@
+import asyncio
 from dataclasses import dataclass
-from datetime import datetime
+from datetime import datetime, timedelta
 from decimal import Decimal
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
-import requests
+from session import Session, TastytradeError
+from utils import match_tz
 
-from session import Session
+from .contracts import CONTRACTS, MONTH_CODES
+from .instrument_cache import INSTRUMENT_CACHE, InstrumentCache
 
 
 @dataclass
@@ -43,25 +46,62 @@ class Future:
     spread_tick_sizes: Optional[List[int]] = None
 
 
-def get_future(session: Session, contract_code: str) -> Future:
-    params: Dict[str, Any] = {"product-code": contract_code}
-    response = requests.get(
-        f"{session.base_url}/instruments/futures/",
-        headers=session.headers,
-        params={k: v for k, v in params.items() if v is not None},
-    )
-    if response.ok:
-        return response.json()["data"]
-    return None
+def get_future(
+    session: Session,
+    contract_code: str,
+    cache: Optional[InstrumentCache] = None,
+) -> Future:
+    if cache is not None:
+        items = cache.lookup(session, "product", [contract_code]).get(contract_code)
+        return {"items": items} if items is not None else None
+
+    try:
+        items = session.scheduler.get_batched(
+            f"{session.base_url}/instruments/futures",
+            "product-code[]",
+            "product-code",
+            [contract_code],
+            headers=session.headers,
+        )[contract_code]
+    except TastytradeError:
+        return None
+    return {"items": items}
 
 
 def get_futures(
     session: Session,
     symbols: Optional[List[str]] = None,
     product_codes: Optional[List[str]] = None,
+    cache: Optional[InstrumentCache] = None,
 ) -> List[Future]:
+    if cache is not None and bool(symbols) != bool(product_codes):
+        kind, keys = ("symbol", symbols) if symbols else ("product", product_codes)
+        found = cache.lookup(session, kind, keys)
+        if not found:
+            return None
+        return [item for key in dict.fromkeys(keys) for item in found.get(key, [])]
+
+    if bool(symbols) != bool(product_codes):
+        # single-kind lookups from concurrent callers are merged into one call
+        param, field, keys = (
+            ("symbol[]", "symbol", symbols)
+            if symbols
+            else ("product-code[]", "product-code", product_codes)
+        )
+        try:
+            found = session.scheduler.get_batched(
+                f"{session.base_url}/instruments/futures",
+                param,
+                field,
+                keys,
+                headers=session.headers,
+            )
+        except TastytradeError:
+            return None
+        return [item for key in dict.fromkeys(keys) for item in found[key]]
+
     params: Dict[str, Any] = {"symbol[]": symbols, "product-code[]": product_codes}
-    response = requests.get(
+    response = session.scheduler.get(
         f"{session.base_url}/instruments/futures",
         headers=session.headers,
         params={k: v for k, v in params.items() if v is not None},
@@ -69,13 +109,37 @@ def get_futures(
     return response.json()["data"]["items"] if response.ok else None
 
 
+async def a_get_future(
+    session: Session,
+    contract_code: str,
+    cache: Optional[InstrumentCache] = None,
+) -> Future:
+    """
+    Like :func:`get_future`, run on a worker thread over the session's
+    pooled client so lookups for many roots can overlap with the streamer.
+    """
+    return await asyncio.to_thread(get_future, session, contract_code, cache)
+
+
+async def a_get_futures(
+    session: Session,
+    symbols: Optional[List[str]] = None,
+    product_codes: Optional[List[str]] = None,
+    cache: Optional[InstrumentCache] = None,
+) -> List[Future]:
+    return await asyncio.to_thread(
+        get_futures, session, symbols, product_codes, cache
+    )
+
+
 def get_all_streamer_symbols(
     session: Session,
     future_contract_code: str,
     flip_keys=False,
+    cache: Optional[InstrumentCache] = INSTRUMENT_CACHE,
 ) -> Dict[str, str]:
     futures_obj_list: List[Future] = get_futures(
-        session=session, product_codes=[future_contract_code]
+        session=session, product_codes=[future_contract_code], cache=cache
     )
     if future_contract_code:
         if flip_keys:
@@ -91,6 +155,17 @@ def get_all_streamer_symbols(
     return None
 
 
+async def a_get_all_streamer_symbols(
+    session: Session,
+    future_contract_code: str,
+    flip_keys=False,
+    cache: Optional[InstrumentCache] = INSTRUMENT_CACHE,
+) -> Dict[str, str]:
+    return await asyncio.to_thread(
+        get_all_streamer_symbols, session, future_contract_code, flip_keys, cache
+    )
+
+
 def gen_futures_streamer_symbols(
     session: Session,
     contract_root: str,
@@ -99,11 +174,12 @@ def gen_futures_streamer_symbols(
     active_months: List[str] = None,
     exchange_code: str = None,
     only_active=True,
+    cache: Optional[InstrumentCache] = INSTRUMENT_CACHE,
 ):
-    month_codes = ["F", "G", "H", "J", "K", "M", "N", "Q", "U", "V", "X", "Z"]
-
     if not active_months or not exchange_code:
-        future_info = get_future(session=session, contract_code=contract_root)
+        future_info = get_future(
+            session=session, contract_code=contract_root, cache=cache
+        )
         if future_info:
             active_months = future_info["items"][0]["future-product"]["listed-months"]
             exchange_code = future_info["items"][0]["future-product"][
@@ -114,14 +190,14 @@ def gen_futures_streamer_symbols(
 
     now = datetime.now()
     current_month = now.month
-    current_yr = now.year
+    current_yr = now.year % 100
     symbols = []
     for year in range(year_start, year_end + 1):
         for month_code in active_months:
             if only_active:
-                year_case = current_yr < year
-                month_case = year_case and current_month < month_codes.index(month_code)
-                if year or month_case:
+                # skip contract months that are already behind us
+                month = MONTH_CODES.index(month_code) + 1
+                if (year, month) >= (current_yr, current_month):
                     symbol = f"/{contract_root}{month_code}{year}:{exchange_code}"
                     symbols.append(symbol)
             else:
@@ -131,64 +207,166 @@ def gen_futures_streamer_symbols(
     return symbols
 
 
-def cme_contract_code_to_datetime(contract_code: str) -> datetime:
-    month_codes = ["F", "G", "H", "J", "K", "M", "N", "Q", "U", "V", "X", "Z"]
-    contract_code = contract_code.replace("/", "")
-    stripped = contract_code.split(":")[0][2:]
-    month_number = month_codes.index(stripped[0]) + 1
-    year = 2000 + int(stripped[1:])
-    return datetime(year, month_number, 1)
-
-
-def sort_cme_contracts(contract_codes):
-    month_code_to_number = {
-        "F": 1,
-        "G": 2,
-        "H": 3,
-        "J": 4,
-        "K": 5,
-        "M": 6,
-        "N": 7,
-        "Q": 8,
-        "U": 9,
-        "V": 10,
-        "X": 11,
-        "Z": 12,
-    }
+async def a_gen_futures_streamer_symbols(
+    session: Session,
+    contract_root: str,
+    year_start: int,
+    year_end: int,
+    active_months: List[str] = None,
+    exchange_code: str = None,
+    only_active=True,
+    cache: Optional[InstrumentCache] = INSTRUMENT_CACHE,
+):
+    return await asyncio.to_thread(
+        gen_futures_streamer_symbols,
+        session,
+        contract_root,
+        year_start,
+        year_end,
+        active_months,
+        exchange_code,
+        only_active,
+        cache,
+    )
+
+
+@dataclass
+class ContractListing:
+    #: streamer symbol, e.g. ``/CLZ24:XNYM``
+    streamer_symbol: str
+    #: first day the contract traded (estimated unless instrument data has it)
+    listed: datetime
+    #: expiration date
+    expires: datetime
+    #: whether the listing date comes from instrument data, not an estimate
+    exact: bool = False
+
+    def overlaps(self, start: datetime, end: datetime) -> bool:
+        return self.listed <= end and self.expires >= start
+
+    def clip(self, start: datetime, end: datetime) -> Tuple[datetime, datetime]:
+        """
+        Returns the part of ``[start, end]`` the contract was trading in.
+        """
+        return max(start, self.listed), min(end, self.expires)
+
 
-    def parse_contract(code):
-        month_code = code[-4:][1]
-        year_code = code[-2:]
-        month_number = month_code_to_number[month_code]
-        year = 2000 + int(year_code)
-        return year, month_number
-
-    sorted_contracts = sorted(contract_codes, key=parse_contract)
-    return sorted_contracts
-
-
-def cme_contract_code_to_datetime(contract_code):
-    month_code_to_number = {
-        "F": 1,
-        "G": 2,
-        "H": 3,
-        "J": 4,
-        "K": 5,
-        "M": 6,
-        "N": 7,
-        "Q": 8,
-        "U": 9,
-        "V": 10,
-        "X": 11,
-        "Z": 12,
+def _parse_date(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value[:10]) if value else None
+
+
+def contract_universe(
+    session: Session,
+    contract_root: str,
+    start: datetime,
+    end: datetime,
+    fallback_horizon_years: int = 5,
+    cache: Optional[InstrumentCache] = INSTRUMENT_CACHE,
+) -> List[ContractListing]:
+    """
+    Returns exactly the contracts of `contract_root` that were trading at
+    some point in ``[start, end]``, in expiry order.
+
+    Contracts listed today come with their real expiration date. Expired
+    ones are generated from the product's listed months, with the expiry
+    offset from the contract month learned from today's chain. Listing
+    dates missing from the instrument data are estimated from the listing
+    horizon (how far ahead contracts are listed) of the same calendar month
+    in today's chain, so a monthly contract is not dated back as far as the
+    far December ones; `fallback_horizon_years` applies when there is no
+    chain. Use :meth:`ContractListing.clip` to request each contract only
+    over the part of the window it traded in.
+    """
+    future_info = get_future(session=session, contract_code=contract_root, cache=cache)
+    if not future_info or not future_info["items"]:
+        return []
+    product = future_info["items"][0]["future-product"]
+    exchange_code = product["streamer-exchange-code"]
+    listed_months = product["listed-months"]
+
+    # instrument dates are naive
+    today = datetime.now()
+    start, end = match_tz(start, today), match_tz(end, today)
+    listed_today = [
+        (item["streamer-symbol"], expires, _parse_date(item.get("first-trade-date")))
+        for item in future_info["items"]
+        if item.get("streamer-symbol")
+        and (expires := _parse_date(item.get("expiration-date"))) is not None
+    ]
+    # listing horizon per contract month, 1 to 12
+    horizons: Dict[int, timedelta] = {}
+    for symbol, expires, _ in listed_today:
+        month = cme_contract_code_to_datetime(symbol).month
+        horizons[month] = max(horizons.get(month, expires - today), expires - today)
+    if listed_today:
+        horizon = max(horizons.values())
+        offsets = sorted(
+            expires - cme_contract_code_to_datetime(symbol)
+            for symbol, expires, _ in listed_today
+        )
+        offset = offsets[len(offsets) // 2]
+    else:
+        horizon = timedelta(days=365 * fallback_horizon_years)
+        offset = timedelta(0)
+
+    def estimate_listed(symbol: str, expires: datetime) -> datetime:
+        month = cme_contract_code_to_datetime(symbol).month
+        return expires - horizons.get(month, horizon)
+
+    known = {
+        symbol: ContractListing(
+            symbol,
+            listed or estimate_listed(symbol, expires),
+            expires,
+            listed is not None,
+        )
+        for symbol, expires, listed in listed_today
     }
-    
-    if ":" in contract_code:
-        contract_code = contract_code.split(":")[0]
-
-    month_code = contract_code[-4:][1]
-    year_code = contract_code[-2:]
-    year = 2000 + int(year_code)
-    month = month_code_to_number[month_code]
-    contract_date = datetime(year, month, 1)
-    return contract_date
+
+    universe = []
+    for year in range(start.year - 1, (end + horizon).year + 1):
+        for month_code in listed_months:
+            symbol = f"/{contract_root}{month_code}{year % 100:02d}:{exchange_code}"
+            contract = known.get(symbol)
+            if contract is None:
+                expires = cme_contract_code_to_datetime(symbol) + offset
+                if expires >= today:
+                    # would be listed today if it existed
+                    continue
+                contract = ContractListing(
+                    symbol, estimate_listed(symbol, expires), expires
+                )
+            if contract.overlaps(start, end):
+                universe.append(contract)
+    return sorted(universe, key=lambda c: c.expires)
+
+
+async def a_contract_universe(
+    session: Session,
+    contract_root: str,
+    start: datetime,
+    end: datetime,
+    fallback_horizon_years: int = 5,
+    cache: Optional[InstrumentCache] = INSTRUMENT_CACHE,
+) -> List[ContractListing]:
+    return await asyncio.to_thread(
+        contract_universe,
+        session,
+        contract_root,
+        start,
+        end,
+        fallback_horizon_years,
+        cache,
+    )
+
+
+def cme_contract_code_to_datetime(contract_code: str) -> datetime:
+    """
+    Returns the first day of the contract month of a code or streamer
+    symbol, e.g. ``/CLZ24:XNYM`` -> 2024-12-01.
+    """
+    return CONTRACTS.get(contract_code).month_start
+
+
+def sort_cme_contracts(contract_codes: List[str]) -> List[str]:
+    return CONTRACTS.sort(contract_codes)
@@ -0,0 +1,218 @@
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from session import Session, TastytradeError
+
+#: cache kinds and the query parameter / item field they are keyed by
+KINDS = {
+    "product": ("product-code[]", "product-code"),
+    "symbol": ("symbol[]", "symbol"),
+}
+
+Entry = Dict[str, Any]
+
+
+class InstrumentCache:
+    """
+    Caches ``/instruments/futures`` items by product code and by symbol,
+    in a bounded in-memory LRU and, if `root` is given, in one JSON file per
+    key on disk so later processes start warm.
+
+    Entries are served without a request for `ttl`. Past that, a single
+    stale key is revalidated with ``If-None-Match``/``If-Modified-Since``
+    when the API sent validators, and several are refetched in one batched
+    call. A failed refresh keeps serving the stale items.
+    """
+
+    def __init__(
+        self,
+        root: Optional[str] = None,
+        ttl: timedelta = timedelta(hours=12),
+        max_entries: int = 1024,
+    ):
+        #: directory of the on-disk layer; memory only if None
+        self.root = root
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str], Entry]" = OrderedDict()
+        # the async lookups run on worker threads
+        self._lock = threading.Lock()
+        if root is not None:
+            os.makedirs(root, exist_ok=True)
+
+    def _path(self, kind: str, key: str) -> str:
+        name = re.sub(r"[^A-Za-z0-9._-]", "_", key.lstrip("/"))
+        return os.path.join(self.root, kind, f"{name}.json")
+
+    def _load(self, kind: str, key: str) -> Optional[Entry]:
+        with self._lock:
+            entry = self._entries.get((kind, key))
+            if entry is not None:
+                self._entries.move_to_end((kind, key))
+                return entry
+        if self.root is None:
+            return None
+        try:
+            with open(self._path(kind, key)) as f:
+                entry = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        self._remember(kind, key, entry)
+        return entry
+
+    def _remember(self, kind: str, key: str, entry: Entry) -> None:
+        with self._lock:
+            self._entries[(kind, key)] = entry
+            self._entries.move_to_end((kind, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _store(self, kind: str, key: str, entry: Entry) -> None:
+        self._remember(kind, key, entry)
+        if self.root is None:
+            return
+        path = self._path(kind, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+
+    def _fresh(self, entry: Entry) -> bool:
+        return time.time() - entry["fetched-at"] < self.ttl.total_seconds()
+
+    def invalidate(self, kind: Optional[str] = None, key: Optional[str] = None):
+        """
+        Drops matching entries from memory and disk; everything by default.
+        """
+        with self._lock:
+            keys = [
+                k
+                for k in self._entries
+                if (kind is None or k[0] == kind) and (key is None or k[1] == key)
+            ]
+            for k in keys:
+                del self._entries[k]
+        if self.root is None:
+            return
+        for entry_kind in [kind] if kind else list(KINDS):
+            directory = os.path.join(self.root, entry_kind)
+            if not os.path.isdir(directory):
+                continue
+            if key is not None:
+                names = [os.path.basename(self._path(entry_kind, key))]
+            else:
+                names = os.listdir(directory)
+            for name in names:
+                try:
+                    os.remove(os.path.join(directory, name))
+                except FileNotFoundError:
+                    pass
+
+    def _fetch(
+        self,
+        session: Session,
+        kind: str,
+        keys: List[str],
+        stale: Dict[str, Entry],
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        param, field = KINDS[kind]
+        url = f"{session.base_url}/instruments/futures"
+        entry = stale.get(keys[0]) if len(keys) == 1 else None
+        if entry is not None and (entry.get("etag") or entry.get("last-modified")):
+            headers = dict(session.headers)
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last-modified"):
+                headers["If-Modified-Since"] = entry["last-modified"]
+            response = session.scheduler.get(
+                url, headers=headers, params={param: keys}
+            )
+            if response.status_code == 304:
+                self._store(kind, keys[0], dict(entry, **{"fetched-at": time.time()}))
+                return {keys[0]: entry["items"]}
+            if not response.ok:
+                return {key: entry["items"] for key, entry in stale.items()}
+            grouped = {keys[0]: []}
+            for item in response.json()["data"]["items"]:
+                if item.get(field) == keys[0]:
+                    grouped[keys[0]].append(item)
+            validators = response.headers
+        else:
+            # nothing to revalidate: merge with concurrent lookups
+            try:
+                grouped = session.scheduler.get_batched(
+                    url, param, field, keys, headers=session.headers
+                )
+            except TastytradeError:
+                return {key: entry["items"] for key, entry in stale.items()}
+            # validators only match a later single-key revalidation
+            validators = (grouped.headers if len(keys) == 1 else None) or {}
+
+        now = time.time()
+        for key, items in grouped.items():
+            self._store(
+                kind,
+                key,
+                {
+                    "fetched-at": now,
+                    "etag": validators.get("ETag"),
+                    "last-modified": validators.get("Last-Modified"),
+                    "items": items,
+                },
+            )
+        return grouped
+
+    def lookup(
+        self, session: Session, kind: str, keys: Iterable[str]
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Returns the instrument items of every key of `kind` (``product`` or
+        ``symbol``), fetching whatever is missing or expired in one request.
+        Keys the API could not be reached for and that were never cached
+        are left out.
+        """
+        found: Dict[str, List[Dict[str, Any]]] = {}
+        missing: List[str] = []
+        stale: Dict[str, Entry] = {}
+        for key in dict.fromkeys(keys):
+            entry = self._load(kind, key)
+            if entry is not None and self._fresh(entry):
+                found[key] = entry["items"]
+                continue
+            missing.append(key)
+            if entry is not None:
+                stale[key] = entry
+        if missing:
+            found.update(self._fetch(session, kind, missing, stale))
+        return found
+
+    def warm(
+        self,
+        session: Session,
+        product_codes: Iterable[str] = (),
+        symbols: Iterable[str] = (),
+    ) -> None:
+        """
+        Refreshes many product codes and symbols with one request per kind,
+        e.g. at startup before a batch of curve pulls.
+        """
+        for kind, keys in (("product", product_codes), ("symbol", symbols)):
+            keys = list(dict.fromkeys(keys))
+            if keys:
+                stale = {
+                    key: entry
+                    for key in keys
+                    if (entry := self._load(kind, key)) is not None
+                }
+                self._fetch(session, kind, keys, stale)
+
+
+#: memory-only cache the futures lookups use unless given another one
+INSTRUMENT_CACHE = InstrumentCache()
@@ -1,33 +1,565 @@
 import asyncio
-from datetime import datetime
-from decimal import Decimal
-from typing import Dict, List, Optional, Set
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
 
+import numpy as np
 import pandas as pd
-from dateutil import tz
 
+from candle_cache import CandleCache
+from curves import CurveMatrix
 from dxfeed_clee.candle import Candle, candle_to_dict
+from dxfeed_clee.columns import (
+    NA_INT,
+    CandleAccumulator,
+    EventAccumulator,
+    columns_to_frame,
+)
+from dxfeed_clee.contracts import CONTRACTS
 from dxfeed_clee.event import EventType
 from dxfeed_clee.futures import (
-    gen_futures_streamer_symbols,
-    get_all_streamer_symbols,
+    a_contract_universe,
+    a_get_all_streamer_symbols,
     sort_cme_contracts,
     cme_contract_code_to_datetime
 )
 from dxfeed_clee.quote import Quote, quote_to_dict
-from session import Session
-from streamer import DXLinkStreamer
-from utils import generate_timestamps
+from rest_history import RestHistory
+from session import Session, TastytradeError
+from sinks import ExcelSink, Sink
+from resample import resample_candles
+from streamer import DXLinkStreamer, candle_symbol, symbol_key
+from utils import (
+    TradingCalendar,
+    generate_timestamps,
+    match_timestamps,
+    match_tz,
+    to_exchange_time,
+)
 
+#: eventFlags bits marking the last event of a time-series snapshot
+SNAPSHOT_END = 0x08
+SNAPSHOT_SNIP = 0x10
+#: eventFlags bit of an event deleting the candle with the same time
+REMOVE_EVENT = 0x02
+
+
+def _snapshot_done(columns: Dict[str, np.ndarray]) -> bool:
+    return bool(np.any(columns["eventFlags"] & (SNAPSHOT_END | SNAPSHOT_SNIP)))
+
+
+def _last_candles(columns: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """
+    Sorts candle columns by time and keeps one candle per time, the one
+    received last; times whose last event removes the candle are dropped.
+    Updates of the current bar and snapshots sent again arrive as repeated
+    times.
+    """
+    # unique over the reversed times keeps the candle received last
+    times = columns["time"][::-1]
+    _, last = np.unique(times, return_index=True)
+    order = len(times) - 1 - last
+    order = order[(columns["eventFlags"][order] & REMOVE_EVENT) == 0]
+    return {name: values[order] for name, values in columns.items()}
+
+
+async def _wait_until_idle(
+    accumulator: EventAccumulator,
+    timeout: float,
+    on_tick: Optional[Callable[[], None]] = None,
+    until: Optional[Callable[[], bool]] = None,
+) -> None:
+    """
+    Returns once no event has reached `accumulator` for `timeout` seconds,
+    which is how the historical functions tell a backfill has finished.
+    `on_tick` is called after every polling period; `until` can end the
+    wait early by returning True.
+    """
+    while True:
+        count = len(accumulator)
+        await asyncio.sleep(timeout)
+        if on_tick is not None:
+            on_tick()
+        if until is not None and until():
+            return
+        if len(accumulator) == count:
+            print(f"No data received for {timeout} seconds, exiting.")
+            return
 
-def convert_to_chicago(ts: float):
-    from_zone = tz.gettz("UTC")
-    to_zone = tz.gettz("America/Chicago")
 
-    dt = datetime.fromtimestamp(ts / 1000)
-    utc = dt.replace(tzinfo=from_zone)
-    central = utc.astimezone(to_zone)
-    return central.timestamp() * 1000
+async def _stream_candles(
+    session: Session,
+    start_times: Dict[str, datetime],
+    interval: str,
+    timeout: float,
+    extended_trading_hours: bool = True,
+    on_tick: Optional[Callable[[CandleAccumulator], None]] = None,
+) -> CandleAccumulator:
+    by_start: Dict[datetime, List[str]] = {}
+    for symbol, start_time in start_times.items():
+        by_start.setdefault(start_time, []).append(symbol)
+
+    candles = CandleAccumulator()
+    async with DXLinkStreamer(session) as streamer:
+        streamer.attach_accumulator(EventType.CANDLE, candles)
+        try:
+            for start_time, symbols in by_start.items():
+                await streamer.subscribe_candle(
+                    symbols=symbols,
+                    interval=interval,
+                    start_time=start_time,
+                    extended_trading_hours=extended_trading_hours,
+                )
+            await _wait_until_idle(
+                candles, timeout, on_tick and (lambda: on_tick(candles))
+            )
+        finally:
+            streamer.detach_accumulator(EventType.CANDLE)
+            await streamer.unsubscribe_candle(
+                symbols=list(start_times),
+                interval=interval,
+                extended_trading_hours=extended_trading_hours,
+            )
+    return candles
+
+
+def _symbol_keys(
+    symbols: Iterable[str], interval: str, extended_trading_hours: bool
+) -> Dict[Tuple[str, str], str]:
+    return {
+        symbol_key(candle_symbol(symbol, interval, extended_trading_hours)): symbol
+        for symbol in symbols
+    }
+
+
+def _requested_symbol(
+    event_symbol: str, keys: Dict[Tuple[str, str], str]
+) -> Optional[str]:
+    # the server may format a candle eventSymbol differently from the one
+    # subscribed, see symbol_key
+    return keys.get(symbol_key(event_symbol))
+
+
+@dataclass
+class BatchReport:
+    #: requested range
+    start: datetime
+    end: datetime
+    #: streamer symbols of the batch
+    symbols: List[str]
+    #: candles kept within the range
+    rows: int
+    #: wall-clock time the batch took
+    seconds: float
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
+def _print_report(report: BatchReport) -> None:
+    print(
+        f"{report.start:%Y-%m-%d %H:%M} -> {report.end:%Y-%m-%d %H:%M} "
+        f"({len(report.symbols)} symbols): {report.rows} candles in "
+        f"{report.seconds:.1f}s ({report.rows_per_second:.0f}/s)"
+    )
+
+
+async def _stream_batch(
+    streamer: DXLinkStreamer,
+    symbols: List[str],
+    interval: str,
+    start_date: datetime,
+    end_date: datetime,
+    timeout: float,
+    extended_trading_hours: bool,
+    completed: Optional[Set[str]] = None,
+) -> Dict[str, Dict[str, np.ndarray]]:
+    """
+    Subscribes every symbol once from `start_date` on `streamer` and returns
+    its candles up to `end_date`. dxLink only takes a start time, so the
+    batch is done once every symbol has delivered the end of its snapshot,
+    or after `timeout` idle seconds. Symbols whose snapshot did end are
+    added to `completed`.
+    """
+    keys = _symbol_keys(symbols, interval, extended_trading_hours)
+    candles = CandleAccumulator()
+
+    def snapshots_done() -> Set[Optional[str]]:
+        return {
+            _requested_symbol(event_symbol, keys)
+            for event_symbol in candles
+            if _snapshot_done(candles.arrays(event_symbol))
+        }
+
+    streamer.attach_accumulator(EventType.CANDLE, candles)
+    try:
+        await streamer.subscribe_candle(
+            symbols=symbols,
+            interval=interval,
+            start_time=start_date,
+            extended_trading_hours=extended_trading_hours,
+        )
+        await _wait_until_idle(
+            candles, timeout, until=lambda: snapshots_done().issuperset(symbols)
+        )
+    finally:
+        streamer.detach_accumulator(EventType.CANDLE)
+        await streamer.unsubscribe_candle(
+            symbols=symbols,
+            interval=interval,
+            extended_trading_hours=extended_trading_hours,
+        )
+
+    if completed is not None:
+        completed.update(snapshots_done().intersection(symbols))
+    start_ms = int(start_date.timestamp() * 1000)
+    end_ms = int(end_date.timestamp() * 1000)
+    batch: Dict[str, Dict[str, np.ndarray]] = {}
+    for event_symbol in candles:
+        symbol = _requested_symbol(event_symbol, keys)
+        if symbol is None:
+            continue
+        # fancy indexing copies, so the accumulator can be dropped
+        columns = _last_candles(candles.arrays(event_symbol))
+        keep = (columns["time"] >= start_ms) & (columns["time"] <= end_ms)
+        batch[symbol] = {name: values[keep] for name, values in columns.items()}
+    return batch
+
+
+async def backfill_candles(
+    session: Session,
+    symbols: List[str],
+    interval: str,
+    start_date: datetime,
+    end_date: datetime,
+    max_concurrency: int = 4,
+    symbols_per_batch: Optional[int] = None,
+    timeout: float = 1,
+    extended_trading_hours: bool = True,
+    on_progress: Optional[Callable[[BatchReport], None]] = _print_report,
+    completed: Optional[Set[str]] = None,
+) -> Dict[str, Dict[str, np.ndarray]]:
+    """
+    Backfills candles of `symbols` between `start_date` and `end_date`,
+    split into batches of `symbols_per_batch` symbols. Batches run
+    concurrently on up to `max_concurrency` streamer connections, each
+    taking the next pending batch when it is done, and `on_progress` is
+    called with a :class:`BatchReport` after each one.
+
+    Every symbol is subscribed exactly once, from `start_date`: dxLink
+    streams a candle subscription from its start time to now, so slicing
+    the range in time would fetch the tail again for every slice. Use the
+    REST source (:class:`~rest_history.RestHistory`) to slice in time.
+
+    Symbols whose snapshot was received to its end, rather than cut short
+    by `timeout`, are added to `completed`.
+    """
+    if symbols_per_batch is None:
+        symbols_per_batch = -(-len(symbols) // max(1, max_concurrency)) or 1
+    pending: asyncio.Queue = asyncio.Queue()
+    for i in range(0, len(symbols), symbols_per_batch):
+        pending.put_nowait(symbols[i : i + symbols_per_batch])
+    candles: Dict[str, Dict[str, np.ndarray]] = {}
+
+    async def worker() -> None:
+        async with DXLinkStreamer(session) as streamer:
+            while not pending.empty():
+                batch_symbols = pending.get_nowait()
+                started = time.monotonic()
+                batch = await _stream_batch(
+                    streamer,
+                    batch_symbols,
+                    interval,
+                    start_date,
+                    end_date,
+                    timeout,
+                    extended_trading_hours,
+                    completed,
+                )
+                candles.update(
+                    (symbol, columns)
+                    for symbol, columns in batch.items()
+                    if len(columns["time"])
+                )
+                if on_progress is not None:
+                    on_progress(
+                        BatchReport(
+                            start=start_date,
+                            end=end_date,
+                            symbols=batch_symbols,
+                            rows=sum(len(c["time"]) for c in batch.values()),
+                            seconds=time.monotonic() - started,
+                        )
+                    )
+
+    await asyncio.gather(
+        *(worker() for _ in range(max(1, min(max_concurrency, pending.qsize()))))
+    )
+    return {symbol: candles[symbol] for symbol in symbols if symbol in candles}
+
+
+async def _collect_candles(
+    session: Session,
+    symbols: List[str],
+    interval: str,
+    start_date: datetime,
+    end_date: datetime,
+    timeout: float,
+    cache: Optional[CandleCache] = None,
+    extended_trading_hours: bool = True,
+    base_interval: Optional[str] = None,
+    calendar: Optional[TradingCalendar] = None,
+    exchange_tz: str = "America/Chicago",
+    window: Optional[timedelta] = None,
+    max_concurrency: int = 4,
+    symbols_per_batch: Optional[int] = None,
+    source: str = "dxlink",
+    sink: Optional[Sink] = None,
+    start_dates: Optional[Dict[str, datetime]] = None,
+) -> Dict[str, Dict[str, np.ndarray]]:
+    """
+    Returns candle columns keyed by streamer symbol. Without a cache this
+    streams everything from `start_date` (or the later per-symbol date in
+    `start_dates`, e.g. the listing date of a contract); with one, only the
+    ranges missing on disk are streamed and written back as they arrive,
+    then the window ``[start_date, end_date]`` is served from disk.
+
+    With a `base_interval` finer than `interval`, only base candles are
+    fetched (or cached) and `interval` candles are resampled locally.
+
+    Passing `symbols_per_batch` streams through :func:`backfill_candles`
+    instead, spreading the symbols over up to `max_concurrency`
+    connections. With `source` ``"rest"`` candles are pulled from the
+    dxFeed REST endpoint instead (see :class:`~rest_history.RestHistory`),
+    in `window` long requests if given; time slicing is only available
+    there.
+
+    Candles are also written to `sink`: as they stream in when everything
+    is streamed on one connection, otherwise once per symbol when it is
+    complete.
+    """
+    if source not in ("dxlink", "rest"):
+        raise TastytradeError(f"Unknown candle source: {source}")
+    if window is not None and source != "rest":
+        raise TastytradeError("Time windows need the REST source")
+    if base_interval and base_interval != interval:
+        candles = await _collect_candles(
+            session,
+            symbols,
+            base_interval,
+            start_date,
+            end_date,
+            timeout,
+            cache,
+            extended_trading_hours,
+            window=window,
+            max_concurrency=max_concurrency,
+            symbols_per_batch=symbols_per_batch,
+            source=source,
+            start_dates=start_dates,
+        )
+        resampled = {
+            symbol: resample_candles(columns, interval, calendar, exchange_tz)
+            for symbol, columns in candles.items()
+        }
+        return _write_sink(sink, resampled)
+
+    start_dates = start_dates or {}
+    starts = {
+        symbol: max(
+            start_date, match_tz(start_dates.get(symbol, start_date), start_date)
+        )
+        for symbol in symbols
+    }
+    symbols = [symbol for symbol in symbols if starts[symbol] <= end_date]
+    batched = (
+        source == "rest" or symbols_per_batch is not None
+    )
+
+    # symbols fetched to the end of their history, as opposed to cut short
+    completed: Set[str] = set()
+
+    async def backfill(
+        symbols: List[str], start_date: datetime
+    ) -> Dict[str, Dict[str, np.ndarray]]:
+        if source == "rest":
+            # a REST fetch either returns the whole range or raises
+            completed.update(symbols)
+            with RestHistory(session, max_concurrency) as rest:
+                return await rest.fetch_candles(
+                    symbols,
+                    interval,
+                    start_date,
+                    # the REST range is half-open, end_date is wanted too
+                    end_date + timedelta(milliseconds=1),
+                    extended_trading_hours,
+                    window,
+                )
+        return await backfill_candles(
+            session,
+            symbols,
+            interval,
+            start_date,
+            end_date,
+            max_concurrency,
+            symbols_per_batch,
+            timeout,
+            extended_trading_hours,
+            completed=completed,
+        )
+
+    async def backfill_from(
+        start_times: Dict[str, datetime]
+    ) -> Dict[str, Dict[str, np.ndarray]]:
+        by_start: Dict[datetime, List[str]] = {}
+        for symbol, start_time in start_times.items():
+            by_start.setdefault(start_time, []).append(symbol)
+        candles: Dict[str, Dict[str, np.ndarray]] = {}
+        for start_time, group in by_start.items():
+            candles.update(await backfill(group, start_time))
+        return candles
+
+    if cache is None and batched:
+        return _write_sink(
+            sink, await backfill_from({symbol: starts[symbol] for symbol in symbols})
+        )
+
+    keys = _symbol_keys(symbols, interval, extended_trading_hours)
+    if cache is None:
+        written: Dict[str, int] = {}
+
+        def stream_to_sink(candles: CandleAccumulator) -> None:
+            for event_symbol in candles:
+                symbol = _requested_symbol(event_symbol, keys)
+                if symbol is None:
+                    continue
+                columns = candles.arrays(event_symbol)
+                done = written.get(event_symbol, 0)
+                sink.write(
+                    symbol, {name: values[done:] for name, values in columns.items()}
+                )
+                written[event_symbol] = len(columns["time"])
+
+        candles = await _stream_candles(
+            session,
+            {symbol: starts[symbol] for symbol in symbols},
+            interval,
+            timeout,
+            extended_trading_hours,
+            stream_to_sink if sink is not None else None,
+        )
+        if sink is not None:
+            stream_to_sink(candles)
+        streamed = {
+            symbol: _last_candles(candles.arrays(event_symbol))
+            for event_symbol in candles
+            if (symbol := _requested_symbol(event_symbol, keys)) is not None
+        }
+        return {
+            symbol: columns
+            for symbol, columns in streamed.items()
+            if len(columns["time"])
+        }
+
+    start_ms = int(start_date.timestamp() * 1000)
+    end_ms = int(end_date.timestamp() * 1000)
+    start_times: Dict[str, datetime] = {}
+    for symbol in symbols:
+        missing = cache.missing(
+            symbol,
+            interval,
+            int(starts[symbol].timestamp() * 1000),
+            end_ms,
+            extended_trading_hours,
+        )
+        if missing:
+            start_times[symbol] = datetime.fromtimestamp(missing[0][0] / 1000)
+
+    # a fetch that got to the end of a symbol's history covers it from the
+    # requested start, up to now if there were no candles at all; one cut
+    # short only covers the candles it received
+    fetched_ms = min(int(time.time() * 1000), end_ms)
+
+    def covered(
+        symbol: str, times: np.ndarray, complete: bool
+    ) -> Optional[Tuple[int, int]]:
+        low = int(start_times[symbol].timestamp() * 1000)
+        if len(times) == 0:
+            return (low, max(low, fetched_ms)) if complete else None
+        high = min(int(times.max()), end_ms)
+        return (low if complete else int(times.min()), high)
+
+    if start_times and batched:
+        fetched = await backfill_from(start_times)
+        for symbol in start_times:
+            columns = fetched.get(symbol, {})
+            cache.append(
+                symbol,
+                interval,
+                columns,
+                covered(symbol, columns.get("time", ()), symbol in completed),
+                extended_trading_hours,
+            )
+    elif start_times:
+        flushed: Dict[str, int] = {}
+
+        def flush(candles: CandleAccumulator, complete: bool = False) -> None:
+            for event_symbol in candles:
+                symbol = _requested_symbol(event_symbol, keys)
+                if symbol is None or symbol not in start_times:
+                    continue
+                columns = candles.arrays(event_symbol)
+                done = flushed.get(event_symbol, 0)
+                new = {name: values[done:] for name, values in columns.items()}
+                if len(new["time"]) == 0 and not complete:
+                    continue
+                # a snapshot is sent in time order (newest first on dxLink),
+                # so what arrived so far is contiguous from one end and
+                # everything between its oldest and newest candle is complete
+                kept = (columns["eventFlags"] & REMOVE_EVENT) == 0
+                cache.append(
+                    symbol,
+                    interval,
+                    _last_candles(new),
+                    covered(
+                        symbol,
+                        columns["time"][kept],
+                        complete and _snapshot_done(columns),
+                    ),
+                    extended_trading_hours,
+                )
+                flushed[event_symbol] = len(columns["time"])
+
+        candles = await _stream_candles(
+            session, start_times, interval, timeout, extended_trading_hours, flush
+        )
+        flush(candles, complete=True)
+
+    candles_dict: Dict[str, Dict[str, np.ndarray]] = {}
+    for symbol in symbols:
+        columns = cache.read(symbol, interval, start_ms, end_ms, extended_trading_hours)
+        if len(columns["time"]) != 0:
+            candles_dict[symbol] = columns
+    return _write_sink(sink, candles_dict)
+
+
+def _write_sink(
+    sink: Optional[Sink], candles: Dict[str, Dict[str, np.ndarray]]
+) -> Dict[str, Dict[str, np.ndarray]]:
+    if sink is not None:
+        for symbol, columns in candles.items():
+            sink.write(symbol, columns)
+    return candles
+
+
+def _column_value(value: Any) -> Any:
+    if isinstance(value, np.integer):
+        return None if value == NA_INT else int(value)
+    if isinstance(value, np.floating):
+        return None if np.isnan(value) else float(value)
+    return value
 
 
 async def main(session):
@@ -48,72 +580,52 @@ async def get_quotes(
     just_bid=False,
     return_df=False,
 ) -> Dict[str, Quote]:
+    """
+    Returns the first quote of every symbol (or just its mid, ask or bid),
+    waiting at most `timeout` seconds in total; symbols that did not quote
+    by then are printed and left out.
+    """
     async with DXLinkStreamer(session) as streamer:
         if symbols and contract_code:
-            streamer_codes: List[str] = get_all_streamer_symbols(
-                session=session, future_contract_code=contract_code, flip_keys=True
+            streamer_codes: List[str] = (
+                await a_get_all_streamer_symbols(
+                    session=session, future_contract_code=contract_code, flip_keys=True
+                )
             ).keys()
             symbols.extend(x for x in streamer_codes if x not in symbols)
-
-        elif symbols:
-            await streamer.subscribe(
-                event_type=EventType.QUOTE,
-                symbols=symbols,
-            )
         elif contract_code:
-            streamer_codes: Dict[str, str] = get_all_streamer_symbols(
+            streamer_codes: Dict[str, str] = await a_get_all_streamer_symbols(
                 session=session, future_contract_code=contract_code, flip_keys=True
             )
             # print(streamer_codes)
             if not streamer_codes:
                 return
 
-            symbols = streamer_codes.keys()
-            await streamer.subscribe(
-                event_type=EventType.QUOTE,
-                symbols=symbols,
-            )
-        else:
+            symbols = list(streamer_codes.keys())
+        elif not symbols:
             return
 
-        async def get_next_quote():
-            async for quote in streamer.listen(EventType.QUOTE):
-                return quote
-            return None
-
-        await streamer.subscribe(EventType.QUOTE, symbols)
-
-        quote_dict: Dict[str, Quote | Decimal] = {}
-        while True:
-            try:
-                quote: Quote = await asyncio.wait_for(get_next_quote(), timeout=timeout)
-                if quote is None:
-                    break
-
-                # quote = quote_to_dict(quote=quote)
-                if just_midpoint:
-                    quote_dict[quote.eventSymbol] = (
-                        (quote.askPrice + quote.bidPrice) / 2
-                        if quote.askPrice and quote.bidPrice
-                        else None
-                    )
-                elif just_ask:
-                    quote_dict[quote.eventSymbol] = quote.askPrice
-                elif just_bid:
-                    quote_dict[quote.eventSymbol] = quote.bidPrice
-                else:
-                    quote_dict[quote.eventSymbol] = quote
-
-                if len(quote_dict) >= len(symbols):
-                    break
-
-            except asyncio.TimeoutError as to:
-                print(to)
-                break
-
-        await streamer.unsubscribe_quote(
-            symbols=symbols,
-        )
+        table = await streamer.snapshot(EventType.QUOTE, symbols, timeout=timeout)
+
+    if table.missing:
+        print(f"{len(table.missing)} symbols not quoted: {', '.join(table.missing)}")
+    bid, ask = table.columns["bidPrice"], table.columns["askPrice"]
+    if just_midpoint:
+        values = np.where((bid != 0) & (ask != 0), (bid + ask) / 2, np.nan)
+    elif just_ask:
+        values = ask
+    elif just_bid:
+        values = bid
+    else:
+        values = None
+
+    quote_dict: Dict[str, Quote | float] = {}
+    for i in np.flatnonzero(table.filled):
+        symbol = table.symbols[i]
+        if values is None:
+            quote_dict[symbol] = Quote(**table.items[symbol])
+        else:
+            quote_dict[symbol] = _column_value(values[i])
 
     if return_df:
         rows = []
@@ -144,106 +656,76 @@ async def get_futures_historical_data(
     contract_code: str = None,
     xlsx_path: Optional[str] = None,
     run_converison=False,
+    exchange_tz: str = "America/Chicago",
+    calendar: Optional[TradingCalendar] = None,
+    cache: Optional[CandleCache] = None,
+    base_interval: Optional[str] = None,
+    window: Optional[timedelta] = None,
+    max_concurrency: int = 4,
+    symbols_per_batch: Optional[int] = None,
+    source: str = "dxlink",
+    sink: Optional[Sink] = None,
 ):
-    async with DXLinkStreamer(session) as streamer:
-        if symbols:
-            await streamer.subscribe_candle(
-                symbols=symbols,
-                interval=interval,
-                start_time=start_date,
-                extended_trading_hours=True,
-            )
-        elif contract_code:
-            streamer_codes: Dict[str, str] = get_all_streamer_symbols(
-                session=session, future_contract_code=contract_code
-            )
-            symbols = streamer_codes.values()
-            await streamer.subscribe_candle(
-                symbols=streamer_codes.values(),
-                interval=interval,
-                start_time=start_date,
-                extended_trading_hours=True,
-            )
-        else:
+    """
+    Returns candle frames keyed by contract code. Candles are also written
+    to `sink` as they arrive (after conversion with `run_converison`); the
+    caller closes it. `xlsx_path` writes one sheet per contract on a worker
+    thread.
+    """
+    if not symbols:
+        if not contract_code:
             return
+        streamer_codes: Dict[str, str] = await a_get_all_streamer_symbols(
+            session=session, future_contract_code=contract_code
+        )
+        symbols = list(streamer_codes.values())
+
+    candles = await _collect_candles(
+        session,
+        symbols,
+        interval,
+        start_date,
+        end_date,
+        timeout,
+        cache,
+        base_interval=base_interval,
+        calendar=calendar,
+        exchange_tz=exchange_tz,
+        window=window,
+        max_concurrency=max_concurrency,
+        symbols_per_batch=symbols_per_batch,
+        source=source,
+        sink=None if run_converison else sink,
+    )
 
-        async def get_next_candle():
-            async for candle in streamer.listen(EventType.CANDLE):
-                return candle
-            return None
-
-        try:
-            ts = set(
-                generate_timestamps(
-                    start_date=start_date, end_date=end_date, interval=interval
-                )
-            )
-
-            candles_dict: Dict[str, List[Dict[str, float | str]]] = {}
-            ts_dict: Dict[str, Set[float]] = {}
-            for ticker in symbols:
-                ticker = ticker.split(":")[0]
-                candles_dict[ticker] = []
-                ts_dict[ticker] = ts.copy()
-
-            while True:
-                try:
-                    candle = await asyncio.wait_for(get_next_candle(), timeout=timeout)
-                    if candle is None:
-                        print("Stream closed, exiting.")
-                        break
-
-                    curr_candle = candle_to_dict(candle=candle)
-                    curr_ticker = curr_candle["eventSymbol"].split(":")[0]
-
-                    if not run_converison:
-                        curr_candles_list = candles_dict[curr_ticker]
-                        curr_candles_list.append(curr_candle)
-                    else:
-                        curr_ts = ts_dict[curr_ticker]
-                        curr_candle["time"] = convert_to_chicago(curr_candle["time"])
-                        if curr_candle["time"] not in curr_ts:
-                            continue
-
-                        curr_candles_list = candles_dict[curr_ticker]
-                        curr_candles_list.append(curr_candle)
-                        curr_ts.discard(curr_candle["time"])
-
-                        if len(curr_ts) == 0:
-                            print("Timestamp set is empty")
-                            continue
-
-                except asyncio.TimeoutError:
-                    print(f"No data received for {timeout} seconds, exiting.")
-                    break
-                except Exception as e:
-                    print(f"error: {e}")
-                    break
-        finally:
-            print(f"{len(ts)} timestamps not found") if run_converison else None
-
-            df_dict = {}
-            if xlsx_path:
-                with pd.ExcelWriter(xlsx_path) as writer:
-                    for symbol, candles in candles_dict.items():
-                        if len(candles) != 0:
-                            df = pd.DataFrame(candles)
-                            df["time"] = pd.to_datetime(df["time"], unit="ms")
-                            df_dict[symbol] = df
-                            df.to_excel(writer, sheet_name=symbol[1:], index=False)
-            else:
-                for symbol, candles in candles_dict.items():
-                    if len(candles) != 0:
-                        df = pd.DataFrame(candles)
-                        df["time"] = pd.to_datetime(df["time"], unit="ms")
-                        df_dict[symbol] = df
-
-            await streamer.unsubscribe_candle(
-                symbols=symbols,
+    excel = ExcelSink(xlsx_path) if xlsx_path else None
+    try:
+        if run_converison:
+            ts = generate_timestamps(
+                start_date=start_date,
+                end_date=end_date,
                 interval=interval,
-                extended_trading_hours=True,
+                calendar=calendar,
             )
 
+        df_dict: Dict[str, pd.DataFrame] = {}
+        for symbol, columns in candles.items():
+            if run_converison:
+                times = to_exchange_time(columns["time"], exchange_tz)
+                keep, found = match_timestamps(ts, times)
+                columns = {name: values[keep] for name, values in columns.items()}
+                columns["time"] = times[keep]
+                print(f"{len(ts) - np.count_nonzero(found)} timestamps not found")
+                if sink is not None:
+                    sink.write(symbol, columns)
+            if len(columns["time"]) != 0:
+                df_dict[CONTRACTS.code(symbol)] = columns_to_frame(columns)
+                if excel is not None:
+                    excel.write(symbol, columns)
+    finally:
+        if excel is not None:
+            await excel.aclose()
+
     return df_dict
 
 
@@ -258,85 +740,73 @@ async def get_historical_forward_curves(
     xlsx_path: Optional[str] = None,
     df_value_key: str = "close",
     return_df: bool = False,
+    exchange_tz: str = "America/Chicago",
+    cache: Optional[CandleCache] = None,
+    base_interval: Optional[str] = None,
+    calendar: Optional[TradingCalendar] = None,
+    window: Optional[timedelta] = None,
+    max_concurrency: int = 4,
+    symbols_per_batch: Optional[int] = None,
+    source: str = "dxlink",
+    sink: Optional[Sink] = None,
 ) -> Dict[datetime, Dict[str, Candle | Dict[str, str | int | float]]] | pd.DataFrame:
-    year_start = int(str(start_date.year)[-2:])
-    year_end = int(str(end_date.year + buffer)[-2:])
-    all_contracts_streamer_symbols = gen_futures_streamer_symbols(
-        session=session,
-        contract_root=contract_code,
-        year_start=year_start,
-        year_end=year_end,
+    """
+    Pulls the history of every contract of `contract_code` that traded
+    between `start_date` and `end_date`, each only from its listing on.
+    Listing dates not in the instrument data are estimates (see
+    :func:`~dxfeed_clee.futures.contract_universe`), and `buffer` is the
+    listing horizon in years assumed when the product has no listed
+    contracts to learn it from.
+    """
+    universe = await a_contract_universe(
+        session, contract_code, start_date, end_date, fallback_horizon_years=buffer
     )
 
-    async with DXLinkStreamer(session) as streamer:
-        await streamer.subscribe_candle(
-            symbols=all_contracts_streamer_symbols,
-            interval=interval,
-            start_time=start_date,
-            extended_trading_hours=True,
-        )
-
-        async def get_next_candle():
-            async for candle in streamer.listen(EventType.CANDLE):
-                return candle
-            return None
-
-        try:
-            candles_dict: Dict[
-                datetime, Dict[str, Candle | Dict[str, str | int | float]]
-            ] = {}
-
-            while True:
-                try:
-                    candle: Candle = await asyncio.wait_for(
-                        get_next_candle(), timeout=timeout
-                    )
-                    if candle is None:
-                        print("Stream closed, exiting.")
-                        break
-
-                    curr_candle = candle_to_dict(candle=candle)
-                    curr_candle["time"] = convert_to_chicago(curr_candle["time"])
-                    curr_date = datetime.fromtimestamp(curr_candle["time"] // 1000)
-                    curr_ticker = curr_candle["eventSymbol"].split(":")[0]
-
-                    if curr_date not in candles_dict:
-                        candles_dict[curr_date] = {}
-
-                    if xlsx_path or return_df:
-                        return_df = True
-                        candles_dict[curr_date][curr_ticker] = curr_candle[df_value_key]
-                    else:
-                        candles_dict[curr_date][curr_ticker] = curr_candle
-
-                except asyncio.TimeoutError:
-                    print(f"No data received for {timeout} seconds, exiting.")
-                    break
-                except Exception as e:
-                    print("Big Error ", e)
-                    break
+    candles = await _collect_candles(
+        session,
+        [contract.streamer_symbol for contract in universe],
+        interval,
+        start_date,
+        end_date,
+        timeout,
+        cache,
+        base_interval=base_interval,
+        calendar=calendar,
+        exchange_tz=exchange_tz,
+        window=window,
+        max_concurrency=max_concurrency,
+        symbols_per_batch=symbols_per_batch,
+        source=source,
+        sink=sink,
+        start_dates={
+            contract.streamer_symbol: contract.listed for contract in universe
+        },
+    )
 
-        finally:
-            await streamer.unsubscribe_candle(
-                symbols=all_contracts_streamer_symbols,
-                interval=interval,
-                extended_trading_hours=True,
-            )
+    if return_df or xlsx_path:
+        matrix = CurveMatrix.from_candles(candles, df_value_key, exchange_tz)
+        df = matrix.to_frame()
+        df = df.iloc[1:]
+        if len(df.columns) and df.iloc[:, 0].isnull().all():
+            df = df.drop(df.columns[0], axis=1)
+        df = df.ffill(axis=1)
+        if xlsx_path:
+            await asyncio.to_thread(df.to_excel, xlsx_path)
+        return df
 
-        if return_df:
-            df = pd.DataFrame(candles_dict)
-            df = df.transpose()
-            df = df.sort_index()
-            sorted_contracts = sort_cme_contracts(list(df.columns.values))
-            df = df[sorted_contracts]
-            df = df.iloc[1:]
-            df = (
-                df.drop(df.columns[0], axis=1) if df.iloc[:, 0].isnull().all() else None
+    candles_dict: Dict[
+        datetime, Dict[str, Candle | Dict[str, str | int | float]]
+    ] = {}
+    for symbol, columns in candles.items():
+        event_symbol = candle_symbol(symbol, interval, True)
+        columns = dict(columns, time=to_exchange_time(columns["time"], exchange_tz))
+        curr_ticker = CONTRACTS.code(symbol)
+        dates = pd.to_datetime(columns["time"] // 1000 * 1000, unit="ms")
+        for i, curr_date in enumerate(dates):
+            curr_candle = {"eventSymbol": event_symbol}
+            curr_candle.update(
+                (name, _column_value(values[i])) for name, values in columns.items()
             )
-            df = df.ffill(axis=1)
-            df.index = pd.to_datetime(df.index)
-            df.index = df.index.tz_localize(None)
-            df.to_excel(xlsx_path) if xlsx_path else None
-            return df
+            candles_dict.setdefault(curr_date, {})[curr_ticker] = curr_candle
 
-        return candles_dict
+    return candles_dict
@@ -3,7 +3,6 @@ import time
 from datetime import datetime
 
 import pandas as pd
-import requests
 import ujson as json
 from dateutil import tz
 
@@ -21,7 +20,7 @@ from streamer import DXLinkStreamer
 
 def get_future(session: Session, symbol: str):
     symbol = symbol.replace("/", "")
-    response = requests.get(
+    response = session.client.get(
         f"{session.base_url}/instruments/futures/{symbol}", headers=session.headers
     )
     if response.ok:
@@ -34,7 +33,7 @@ def get_future(session: Session, symbol: str):
 
 def get_cryto(session: Session, symbol: str):
     params = {"symbol[]": [symbol]}
-    response = requests.get(
+    response = session.client.get(
         f"{session.base_url}/instruments/cryptocurrencies",
         headers=session.headers,
         params=params,
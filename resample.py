@@ -0,0 +1,139 @@
+from datetime import timedelta
+from typing import Dict, Optional
+
+import numpy as np
+
+from dxfeed_clee.columns import CANDLE_SCHEMA, NA_INT
+from utils import (
+    DEFAULT_CALENDAR,
+    MS_PER_DAY,
+    TradingCalendar,
+    interval_to_timedelta,
+    to_exchange_time,
+)
+
+
+def _first_valid(valid: np.ndarray, starts: np.ndarray):
+    positions = np.where(valid, np.arange(len(valid)), len(valid))
+    first = np.minimum.reduceat(positions, starts)
+    return first, first < len(valid)
+
+
+def _last_valid(valid: np.ndarray, starts: np.ndarray):
+    positions = np.where(valid, np.arange(len(valid)), -1)
+    last = np.maximum.reduceat(positions, starts)
+    return last, last >= 0
+
+
+def _pick(values: np.ndarray, positions: np.ndarray, found: np.ndarray, missing):
+    out = np.full(len(positions), missing, dtype=values.dtype)
+    out[found] = values[positions[found]]
+    return out
+
+
+def _int_sum(values: np.ndarray, starts: np.ndarray) -> np.ndarray:
+    valid = values != NA_INT
+    total = np.add.reduceat(np.where(valid, values, 0), starts)
+    any_valid = np.logical_or.reduceat(valid, starts)
+    return np.where(any_valid, total, NA_INT)
+
+
+def bar_keys(
+    local: np.ndarray,
+    interval: str,
+    calendar: TradingCalendar = DEFAULT_CALENDAR,
+) -> np.ndarray:
+    """
+    Returns the start of the `interval` bar every exchange-time timestamp
+    (naive ms, see :func:`~utils.to_exchange_time`) falls in. Bars are
+    aligned to the session open of `calendar` and never span two sessions;
+    intervals of a day or more group whole sessions, counted from the
+    calendar's week start, so ``1w`` bars begin on Mondays by default:
+
+    >>> import numpy as np
+    >>> thursday = np.array([1718884800000])  # 2024-06-20 12:00
+    >>> start = bar_keys(thursday, "1w")[0]
+    >>> np.datetime64(int(start), "ms").item().strftime("%A %Y-%m-%d")
+    'Monday 2024-06-17'
+    """
+    step = interval_to_timedelta(interval) // timedelta(milliseconds=1)
+    open_ms, _ = calendar.session_bounds_ms
+    sessions = calendar.session_ids(local)
+    if step >= MS_PER_DAY:
+        days = step // MS_PER_DAY
+        return calendar.period_start(sessions, days) * MS_PER_DAY + open_ms
+    session_open = sessions * MS_PER_DAY + open_ms
+    return session_open + (local - session_open) // step * step
+
+
+def resample_candles(
+    columns: Dict[str, np.ndarray],
+    interval: str,
+    calendar: Optional[TradingCalendar] = None,
+    exchange_tz: str = "America/Chicago",
+) -> Dict[str, np.ndarray]:
+    """
+    Builds coarser candles from finer candle columns in one vectorized
+    pass. The result has the columns of
+    :data:`~dxfeed_clee.columns.CANDLE_SCHEMA` (times in UTC ms, like the
+    input): OHLC from the first/max/min/last valid prices, summed volume,
+    bid/ask volume and count, volume-weighted vwap and the last open
+    interest and implied volatility of each bar.
+    """
+    times = columns["time"]
+    if len(times) == 0:
+        return {
+            name: np.empty(0, dtype=dtype)
+            for name, dtype in CANDLE_SCHEMA.items()
+            if name != "eventSymbol"
+        }
+
+    if np.any(times[1:] < times[:-1]):
+        order = np.argsort(times, kind="stable")
+        columns = {name: values[order] for name, values in columns.items()}
+        times = columns["time"]
+
+    local = to_exchange_time(times, exchange_tz)
+    keys = bar_keys(local, interval, calendar or DEFAULT_CALENDAR)
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    # back to UTC with the offset in force at the first candle of each bar
+    bar_times = keys[starts] - (local[starts] - times[starts])
+
+    open_, high, low, close = (
+        columns[name] for name in ("open", "high", "low", "close")
+    )
+    first, found = _first_valid(~np.isnan(open_), starts)
+    last, last_found = _last_valid(~np.isnan(close), starts)
+
+    volume = columns["volume"]
+    vwap = columns["vwap"]
+    weighted = ~np.isnan(vwap) & (volume != NA_INT) & (volume > 0)
+    vwap_num = np.add.reduceat(np.where(weighted, vwap * volume, 0.0), starts)
+    vwap_den = np.add.reduceat(np.where(weighted, volume, 0), starts)
+
+    oi = columns["openInterest"]
+    oi_last, oi_found = _last_valid(oi != NA_INT, starts)
+    iv = columns["impVolatility"]
+    iv_last, iv_found = _last_valid(~np.isnan(iv), starts)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        resampled = {
+            "eventTime": np.maximum.reduceat(columns["eventTime"], starts),
+            "eventFlags": np.zeros(len(starts), dtype=np.int64),
+            # dxFeed candle index: seconds since epoch in the high 32 bits
+            "index": (bar_times // 1000) << 32,
+            "time": bar_times,
+            "sequence": np.zeros(len(starts), dtype=np.int64),
+            "count": _int_sum(columns["count"], starts),
+            "open": _pick(open_, first, found, np.nan),
+            "high": np.fmax.reduceat(high, starts),
+            "low": np.fmin.reduceat(low, starts),
+            "close": _pick(close, last, last_found, np.nan),
+            "volume": _int_sum(volume, starts),
+            "vwap": np.where(vwap_den > 0, vwap_num / vwap_den, np.nan),
+            "bidVolume": _int_sum(columns["bidVolume"], starts),
+            "askVolume": _int_sum(columns["askVolume"], starts),
+            "impVolatility": _pick(iv, iv_last, iv_found, np.nan),
+            "openInterest": _pick(oi, oi_last, oi_found, NA_INT),
+        }
+    return {name: resampled[name] for name in columns if name in resampled}
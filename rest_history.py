@@ -0,0 +1,212 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import requests
+
+from dxfeed_clee.columns import EVENT_SCHEMAS, EventAccumulator
+from dxfeed_clee.event import EventType
+from session import ProductionSession, TastytradeError, http_client
+from streamer import candle_symbol
+
+try:
+    import ijson
+except ImportError:  # pragma: no cover
+    ijson = None
+
+
+def _format_time(time_ms: int) -> str:
+    utc = datetime.fromtimestamp(time_ms / 1000, timezone.utc)
+    return utc.strftime("%Y%m%d-%H%M%S") + "Z"
+
+
+def _time_slices(
+    start_ms: int, end_ms: int, slice_length: Optional[timedelta]
+) -> List[Tuple[int, int]]:
+    step = slice_length // timedelta(milliseconds=1) if slice_length else None
+    slices = []
+    slice_start = start_ms
+    while slice_start < end_ms:
+        slice_end = min(slice_start + step, end_ms) if step else end_ms
+        slices.append((slice_start, slice_end))
+        slice_start = slice_end
+    return slices
+
+
+class RestHistory:
+    """
+    Pulls event history from the dxFeed REST endpoint of a session
+    (``rest_url``), as an alternative to a websocket backfill for large
+    ranges: no channel setup and no idle timeout to wait out.
+
+    Requests go through one pooled keep-alive HTTP client holding up to
+    `max_connections` connections, and as many requests run concurrently.
+    Responses are decoded into columns as they are read when ``ijson`` is
+    installed, and parsed whole otherwise.
+    """
+
+    def __init__(
+        self,
+        session: ProductionSession,
+        max_connections: int = 8,
+        timeout: float = 60,
+    ):
+        #: the ``events.json`` endpoint of the session
+        self.url = session.rest_url
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self._http = http_client(max_connections)
+        self._http.headers.update(session.streamer_headers)
+
+    def __enter__(self) -> "RestHistory":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._http.close()
+
+    def _iter_items(
+        self, response: requests.Response, event_type: EventType, event_symbol: str
+    ) -> Iterator[Dict[str, Any]]:
+        if ijson is None:
+            yield from response.json().get(event_type.value, {}).get(event_symbol, [])
+            return
+        response.raw.decode_content = True
+        # the symbol is matched as a key of the event-type object: an ijson
+        # prefix joins keys with dots, so it cannot single out ``BRK.B``
+        symbol = None
+        builder = None
+        depth = 0
+        for prefix, event, value in ijson.parse(response.raw, use_float=True):
+            if builder is not None:
+                builder.event(event, value)
+                depth += event in ("start_map", "start_array")
+                depth -= event in ("end_map", "end_array")
+                if depth == 0:
+                    yield builder.value
+                    builder = None
+            elif prefix == event_type.value and event == "map_key":
+                symbol = value
+            elif (
+                symbol == event_symbol
+                and event == "start_map"
+                and prefix == f"{event_type.value}.{event_symbol}.item"
+            ):
+                builder = ijson.ObjectBuilder()
+                builder.event(event, value)
+                depth = 1
+
+    def fetch(
+        self,
+        event_type: EventType,
+        event_symbol: str,
+        start_ms: int,
+        end_ms: int,
+    ) -> Dict[str, np.ndarray]:
+        """
+        Fetches the events of one symbol with ``start_ms <= time < end_ms``
+        in a single blocking request and returns them as columns sorted by
+        time.
+        """
+        params = {
+            "events": event_type.value,
+            "symbols": event_symbol,
+            "fromTime": _format_time(start_ms),
+            "toTime": _format_time(end_ms),
+        }
+        events = EventAccumulator(EVENT_SCHEMAS[event_type])
+        with self._http.get(
+            self.url, params=params, stream=True, timeout=self.timeout
+        ) as response:
+            if response.status_code // 100 != 2:
+                raise TastytradeError(
+                    f"{response.status_code}: {response.text[:200]}"
+                )
+            for item in self._iter_items(response, event_type, event_symbol):
+                item.setdefault("eventSymbol", event_symbol)
+                events.append(item)
+
+        if event_symbol not in events:
+            return {
+                name: np.empty(0, dtype=dtype) for name, dtype in events.schema.items()
+            }
+        columns = events.arrays(event_symbol)
+        times = columns["time"]
+        keep = np.flatnonzero((times >= start_ms) & (times < end_ms))
+        keep = keep[np.argsort(times[keep], kind="stable")]
+        return {name: values[keep] for name, values in columns.items()}
+
+    async def fetch_events(
+        self,
+        event_type: EventType,
+        symbols: List[str],
+        start_date: datetime,
+        end_date: datetime,
+        slice_length: Optional[timedelta] = None,
+    ) -> Dict[str, Dict[str, np.ndarray]]:
+        """
+        Fetches ``[start_date, end_date)`` for every symbol, split into
+        requests of `slice_length` each, with up to `max_connections`
+        requests in flight. Returns columns keyed by symbol; slices are
+        joined in time order, so the result does not depend on which
+        request finished first. Symbols without events are left out.
+        """
+        slices = _time_slices(
+            int(start_date.timestamp() * 1000),
+            int(end_date.timestamp() * 1000),
+            slice_length,
+        )
+        limit = asyncio.Semaphore(self.max_connections)
+
+        async def fetch(symbol: str, start_ms: int, end_ms: int):
+            async with limit:
+                return await asyncio.to_thread(
+                    self.fetch, event_type, symbol, start_ms, end_ms
+                )
+
+        results = await asyncio.gather(
+            *(
+                fetch(symbol, start_ms, end_ms)
+                for symbol in symbols
+                for start_ms, end_ms in slices
+            )
+        )
+
+        events: Dict[str, Dict[str, np.ndarray]] = {}
+        for i, symbol in enumerate(symbols):
+            parts = results[i * len(slices) : (i + 1) * len(slices)]
+            if not any(len(part["time"]) for part in parts):
+                continue
+            events[symbol] = {
+                name: np.concatenate([part[name] for part in parts])
+                for name in parts[0]
+            }
+        return events
+
+    async def fetch_candles(
+        self,
+        symbols: List[str],
+        interval: str,
+        start_date: datetime,
+        end_date: datetime,
+        extended_trading_hours: bool = True,
+        slice_length: Optional[timedelta] = None,
+    ) -> Dict[str, Dict[str, np.ndarray]]:
+        """
+        Like :meth:`fetch_events` for `interval` candles of plain streamer
+        symbols, e.g. ``/ESZ24:XCME``; the result is keyed by those symbols.
+        """
+        event_symbols = {
+            candle_symbol(symbol, interval, extended_trading_hours): symbol
+            for symbol in symbols
+        }
+        candles = await self.fetch_events(
+            EventType.CANDLE, list(event_symbols), start_date, end_date, slice_length
+        )
+        return {
+            event_symbols[event_symbol]: columns
+            for event_symbol, columns in candles.items()
+        }
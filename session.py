@@ -1,10 +1,25 @@
+import json
+import os
+import random
+import threading
+import time
 import requests
-from abc import ABC
-from typing import Any, Dict, Optional
+from abc import ABC, abstractmethod
+from concurrent.futures import Future
+from datetime import datetime, timedelta, timezone
+from requests.adapters import HTTPAdapter
+from typing import Any, Dict, Hashable, Iterable, List, Mapping, Optional, Tuple
 
 
 API_URL = "https://api.tastyworks.com"
 CERT_URL = "https://api.cert.tastyworks.com"
+#: keep-alive connections kept open per host by a session's HTTP client
+POOL_SIZE = 16
+#: assumed token lifetimes when the API does not send an expiry
+SESSION_LIFETIME = timedelta(hours=24)
+STREAMER_TOKEN_LIFETIME = timedelta(hours=20)
+#: tokens this close to expiring are treated as expired
+EXPIRY_MARGIN = timedelta(minutes=5)
 
 
 class TastytradeError(Exception):
@@ -26,29 +41,295 @@ def validate_response(response: requests.Response) -> None:
         raise TastytradeError(error_message)
 
 
+def _parse_expiration(value: Optional[str], lifetime: timedelta) -> datetime:
+    if value:
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return datetime.now(timezone.utc) + lifetime
+
+
+def _expired(expiration: datetime) -> bool:
+    return expiration - EXPIRY_MARGIN <= datetime.now(timezone.utc)
+
+
+def http_client(pool_size: int = POOL_SIZE) -> requests.Session:
+    """
+    Returns a :class:`requests.Session` that keeps up to `pool_size`
+    connections per host alive, so repeated calls skip the TCP and TLS
+    handshakes. It is safe to share between threads.
+    """
+    client = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+    client.mount("https://", adapter)
+    client.mount("http://", adapter)
+    return client
+
+
+#: statuses worth retrying: rate limited or a transient server error
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+#: default sustained requests per second and burst size of the token bucket
+RATE = 10.0
+BURST = 20
+
+
+def _freeze(mapping: Optional[Dict[str, Any]]) -> Hashable:
+    if not mapping:
+        return ()
+    return tuple(
+        sorted(
+            (key, tuple(value) if isinstance(value, list) else value)
+            for key, value in mapping.items()
+        )
+    )
+
+
+class _Batch:
+    def __init__(self):
+        self.keys: Dict[str, None] = {}
+        self.future: Future = Future()
+        self.headers: Optional[Mapping[str, str]] = None
+
+
+class BatchResult(dict):
+    """
+    Items per key returned by :meth:`RequestScheduler.get_batched`.
+    """
+
+    #: response headers, only set when the call carried exactly the keys
+    #: asked for, so validators such as ``ETag`` belong to that request
+    headers: Optional[Mapping[str, str]] = None
+
+
+class RequestScheduler:
+    """
+    Sends the REST calls of a session through one token bucket (`rate`
+    requests per second, bursts of up to `burst`), retrying 429 and 5xx
+    responses and connection errors with jittered exponential backoff, or
+    after ``Retry-After`` when the API sends it.
+
+    Identical GETs in flight at the same time share one request, and
+    :meth:`get_batched` merges lookups of single keys (e.g. product codes)
+    made within `batch_window` seconds into one call with an array
+    parameter. It is thread-safe; the async lookups call it from worker
+    threads.
+    """
+
+    def __init__(
+        self,
+        client: requests.Session,
+        rate: float = RATE,
+        burst: int = BURST,
+        max_retries: int = 4,
+        backoff: float = 0.25,
+        batch_window: float = 0.01,
+    ):
+        self.client = client
+        self.rate = rate
+        self.burst = burst
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.batch_window = batch_window
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._bucket_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._in_flight: Dict[Hashable, Future] = {}
+        self._batches: Dict[Hashable, _Batch] = {}
+
+    def _acquire(self) -> None:
+        while True:
+            with self._bucket_lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.burst, self._tokens + (now - self._updated) * self.rate
+                )
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def _delay(self, attempt: int, response: Optional[requests.Response]) -> float:
+        retry_after = (
+            response.headers.get("Retry-After") if response is not None else None
+        )
+        if retry_after is not None:
+            try:
+                return float(retry_after)
+            except ValueError:
+                pass
+        return self.backoff * 2**attempt * random.uniform(0.5, 1.5)
+
+    def _send(self, method: str, url: str, **kwargs) -> requests.Response:
+        attempt = 0
+        while True:
+            self._acquire()
+            try:
+                response = self.client.request(method, url, **kwargs)
+            except requests.ConnectionError:
+                if attempt >= self.max_retries:
+                    raise
+                response = None
+            else:
+                if (
+                    response.status_code not in RETRY_STATUSES
+                    or attempt >= self.max_retries
+                ):
+                    return response
+            time.sleep(self._delay(attempt, response))
+            attempt += 1
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        params: Optional[Dict[str, Any]] = None,
+        headers: Optional[Dict[str, str]] = None,
+        **kwargs,
+    ) -> requests.Response:
+        """
+        Sends one request with rate limiting and retries. A GET identical
+        to one already in flight waits for that one's response instead.
+        """
+        if method.upper() != "GET":
+            return self._send(method, url, params=params, headers=headers, **kwargs)
+
+        key = (url, _freeze(params), _freeze(headers))
+        with self._lock:
+            future = self._in_flight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._in_flight[key] = future
+        if not owner:
+            return future.result()
+        try:
+            response = self._send(method, url, params=params, headers=headers, **kwargs)
+            future.set_result(response)
+            return response
+        except BaseException as error:
+            future.set_exception(error)
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def get_batched(
+        self,
+        url: str,
+        param: str,
+        field: str,
+        keys: Iterable[str],
+        headers: Optional[Dict[str, str]] = None,
+    ) -> BatchResult:
+        """
+        Looks up ``data.items`` of `url` for every key, grouped by the
+        item's `field`. Keys requested by other threads within
+        `batch_window` are sent in the same call as ``param=k1&param=k2``.
+        Raises :class:`TastytradeError` if the call fails.
+        """
+        keys = list(dict.fromkeys(keys))
+        batch_key: Tuple = (url, param, _freeze(headers))
+        with self._lock:
+            batch = self._batches.get(batch_key)
+            leader = batch is None
+            if leader:
+                batch = _Batch()
+                self._batches[batch_key] = batch
+            batch.keys.update(dict.fromkeys(keys))
+
+        if leader:
+            time.sleep(self.batch_window)
+            with self._lock:
+                # later lookups start the next batch
+                del self._batches[batch_key]
+            try:
+                response = self.get(
+                    url, params={param: list(batch.keys)}, headers=headers
+                )
+                try:
+                    validate_response(response)
+                except ValueError:
+                    # error bodies that are not the API's JSON, e.g. from a proxy
+                    raise TastytradeError(f"{response.status_code}: {response.reason}")
+                batch.headers = response.headers
+                grouped: Dict[str, List[Dict[str, Any]]] = {
+                    key: [] for key in batch.keys
+                }
+                for item in response.json()["data"]["items"]:
+                    if item.get(field) in grouped:
+                        grouped[item[field]].append(item)
+                batch.future.set_result(grouped)
+            except BaseException as error:
+                batch.future.set_exception(error)
+
+        grouped = batch.future.result()
+        result = BatchResult((key, grouped[key]) for key in keys)
+        if list(batch.keys) == keys:
+            result.headers = batch.headers
+        return result
+
+
 class Session(ABC):
     base_url: str
     headers: Dict[str, str]
     user: Dict[str, str]
     session_token: str
+    #: pooled HTTP client every API call of the session goes through
+    client: requests.Session
+    #: rate limiting, retries and coalescing for the session's lookups
+    scheduler: RequestScheduler
+    #: dxLink websocket url and the token it authenticates with
+    dxlink_url: str
+    streamer_token: str
 
     def validate(self) -> bool:
-        response = requests.post(
+        response = self.client.post(
             f"{self.base_url}/sessions/validate", headers=self.headers
         )
         return response.status_code // 100 == 2
 
     def destroy(self) -> bool:
-        response = requests.delete(f"{self.base_url}/sessions", headers=self.headers)
+        response = self.client.delete(
+            f"{self.base_url}/sessions", headers=self.headers
+        )
         return response.status_code // 100 == 2
 
     def get_customer(self) -> Dict[str, Any]:
-        response = requests.get(f"{self.base_url}/customers/me", headers=self.headers)
+        response = self.scheduler.get(
+            f"{self.base_url}/customers/me", headers=self.headers
+        )
         validate_response(response)
         return response.json()["data"]
 
+    @abstractmethod
+    def streamer_token_expired(self) -> bool:
+        """
+        Whether the streamer token must be refreshed before connecting.
+        """
+
+    @abstractmethod
+    def refresh_streamer_token(self) -> None:
+        """
+        Pulls a new streamer token and the streamer urls.
+        """
+
 
 class ProductionSession(Session):
+    """
+    Logs in to the API and fetches the streamer token and urls.
+
+    With `token_path`, the session and streamer tokens are saved to that
+    file together with their expiry, and a later session for the same login
+    reuses them while they are valid: it makes no request at all, so a
+    streamer can connect right away. Expired or rejected tokens are
+    refreshed transparently: any API call answered with 401 logs in again
+    (with the password or the latest remember token) and is retried once.
+    """
+
     def __init__(
         self,
         login: str,
@@ -56,50 +337,174 @@ class ProductionSession(Session):
         remember_me: bool = False,
         remember_token: Optional[str] = None,
         two_factor_authentication: Optional[str] = None,
+        pool_size: int = POOL_SIZE,
+        token_path: Optional[str] = None,
+        rate_limit: float = RATE,
     ):
-        body = {"login": login, "remember-me": remember_me}
-        if password is not None:
-            body["password"] = password
-        elif remember_token is not None:
-            body["remember-token"] = remember_token
-        else:
+        #: The base url to use for API requests
+        self.base_url: str = API_URL
+        #: The pooled HTTP client used for API requests
+        self.client: requests.Session = http_client(pool_size)
+        self.client.hooks["response"].append(self._retry_unauthorized)
+        #: Rate-limited, retrying front of `client` for API lookups
+        self.scheduler = RequestScheduler(self.client, rate=rate_limit)
+        #: File the tokens are persisted to, if any
+        self.token_path = token_path
+        #: The headers to use for API requests; updated in place on refresh
+        self.headers: Dict[str, str] = {}
+        #: A single-use token which can be used to login without a password
+        self.remember_token: Optional[str] = remember_token
+        #: When the session token stops being valid
+        self.session_expiration: Optional[datetime] = None
+        #: When the streamer token stops being valid
+        self.streamer_expiration: Optional[datetime] = None
+        self._login = login
+        self._password = password
+        self._remember_me = remember_me
+        self._refresh_lock = threading.RLock()
+
+        if self._load_tokens():
+            if self.streamer_expiration is None or _expired(self.streamer_expiration):
+                self.refresh_streamer_token()
+            return
+        if password is None and remember_token is None:
             raise TastytradeError(
                 "You must provide a password or remember " "token to log in."
             )
-        #: The base url to use for API requests
-        self.base_url: str = API_URL
+        self._create_session(two_factor_authentication)
+        self.validate()
+        self.refresh_streamer_token()
+
+    def _create_session(self, two_factor_authentication: Optional[str] = None):
+        body = {"login": self._login, "remember-me": self._remember_me}
+        if self._password is not None:
+            body["password"] = self._password
+        elif self.remember_token is not None:
+            body["remember-token"] = self.remember_token
+        else:
+            raise TastytradeError("No password or remember token to log in again.")
 
         if two_factor_authentication is not None:
             headers = {"X-Tastyworks-OTP": two_factor_authentication}
-            response = requests.post(
+            response = self.client.post(
                 f"{self.base_url}/sessions", json=body, headers=headers
             )
         else:
-            response = requests.post(f"{self.base_url}/sessions", json=body)
+            response = self.client.post(f"{self.base_url}/sessions", json=body)
         validate_response(response)  # throws exception if not 200
 
-        json = response.json()
+        data = response.json()["data"]
         #: The user dict returned by the API; contains basic user information
-        self.user: Dict[str, str] = json["data"]["user"]
+        self.user: Dict[str, str] = data["user"]
         #: The session token used to authenticate requests
-        self.session_token: str = json["data"]["session-token"]
-        #: A single-use token which can be used to login without a password
-        self.remember_token: Optional[str] = (
-            json["data"]["remember-token"] if remember_me else None
+        self.session_token: str = data["session-token"]
+        self.session_expiration = _parse_expiration(
+            data.get("session-expiration"), SESSION_LIFETIME
         )
-        #: The headers to use for API requests
-        self.headers: Dict[str, str] = {"Authorization": self.session_token}
-        self.validate()
+        self.remember_token = (
+            data.get("remember-token") if self._remember_me else None
+        )
+        self.headers["Authorization"] = self.session_token
 
-        #: Pull streamer tokens and urls
-        response = requests.get(
+    def refresh_streamer_token(self) -> None:
+        """
+        Pulls a new streamer token and the streamer urls, and saves the
+        tokens if the session persists them.
+        """
+        response = self.scheduler.get(
             f"{self.base_url}/quote-streamer-tokens", headers=self.headers
         )
         validate_response(response)
-        data = response.json()["data"]
+        self._set_streamer(response.json()["data"])
+        self._save_tokens()
+
+    def _set_streamer(self, data: Dict[str, Any]) -> None:
         self.streamer_token = data["token"]
+        self.streamer_expiration = _parse_expiration(
+            data.get("expires-at"), STREAMER_TOKEN_LIFETIME
+        )
+        self._websocket_url = data["websocket-url"]
         url = data["websocket-url"] + "/cometd"
         self.dxfeed_url = url.replace("https", "wss")
         self.dxlink_url = data["dxlink-url"]
         self.rest_url = data["websocket-url"] + "/rest/events.json"
-        self.streamer_headers = {"Authorization": f"Bearer {self.streamer_token}"}
\ No newline at end of file
+        self.streamer_headers = {"Authorization": f"Bearer {self.streamer_token}"}
+
+    def refresh(self, stale_token: Optional[str] = None) -> None:
+        """
+        Logs in again and pulls a new streamer token. With `stale_token`,
+        nothing is done if another thread already replaced that token.
+        """
+        with self._refresh_lock:
+            if stale_token is not None and stale_token != self.session_token:
+                return
+            self._create_session()
+            self.refresh_streamer_token()
+
+    def streamer_token_expired(self) -> bool:
+        return self.streamer_expiration is not None and _expired(
+            self.streamer_expiration
+        )
+
+    def _retry_unauthorized(self, response: requests.Response, *args, **kwargs):
+        request = response.request
+        token = request.headers.get("Authorization")
+        if (
+            response.status_code != 401
+            or token is None
+            or not request.url.startswith(self.base_url)
+            or getattr(request, "_retried", False)
+        ):
+            return response
+        self.refresh(stale_token=token)
+        retry = request.copy()
+        retry.headers["Authorization"] = self.session_token
+        retry._retried = True
+        return self.client.send(retry)
+
+    def _load_tokens(self) -> bool:
+        if self.token_path is None:
+            return False
+        try:
+            with open(self.token_path) as f:
+                saved = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return False
+        expiration = datetime.fromisoformat(saved["session-expiration"])
+        if saved.get("login") != self._login or _expired(expiration):
+            return False
+
+        self.user = saved["user"]
+        self.session_token = saved["session-token"]
+        self.session_expiration = expiration
+        self.headers["Authorization"] = self.session_token
+        self.remember_token = saved.get("remember-token") or self.remember_token
+        if saved.get("streamer") is not None:
+            self._set_streamer(saved["streamer"])
+            self.streamer_expiration = datetime.fromisoformat(
+                saved["streamer-expiration"]
+            )
+        return True
+
+    def _save_tokens(self) -> None:
+        if self.token_path is None:
+            return
+        saved = {
+            "login": self._login,
+            "user": self.user,
+            "session-token": self.session_token,
+            "session-expiration": self.session_expiration.isoformat(),
+            "remember-token": self.remember_token,
+            "streamer": {
+                "token": self.streamer_token,
+                "websocket-url": self._websocket_url,
+                "dxlink-url": self.dxlink_url,
+            },
+            "streamer-expiration": self.streamer_expiration.isoformat(),
+        }
+        tmp_path = f"{self.token_path}.tmp"
+        # the file holds credentials, so only the owner may read it
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            json.dump(saved, f)
+        os.replace(tmp_path, self.token_path)
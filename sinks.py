@@ -0,0 +1,190 @@
+import asyncio
+import os
+import queue
+import re
+import threading
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from dxfeed_clee.columns import columns_to_arrow, columns_to_frame
+from dxfeed_clee.contracts import CONTRACTS
+
+
+def _file_name(symbol: str) -> str:
+    return re.sub(r"[^A-Za-z0-9._-]", "_", symbol.lstrip("/"))
+
+
+class Sink(ABC):
+    """
+    Writes candle (or tick) columns keyed by symbol as they arrive. Every
+    :meth:`write` only queues the columns; a worker thread does the encoding
+    and the I/O, so writing never blocks the event loop or the websocket
+    reader. Errors raised by the worker surface on the next :meth:`write`
+    or on :meth:`close`.
+
+    Subclasses implement :meth:`_write` and may override :meth:`_close`,
+    both of which only ever run on the worker thread.
+    """
+
+    def __init__(self, path: str):
+        #: output file or directory, depending on the sink
+        self.path = path
+        self._queue: queue.Queue = queue.Queue()
+        self._error: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def __enter__(self) -> "Sink":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def _run(self) -> None:
+        while True:
+            job = self._queue.get()
+            if job is None:
+                break
+            if self._error is not None:
+                continue
+            try:
+                self._write(*job)
+            except BaseException as error:
+                self._error = error
+        try:
+            self._close()
+        except BaseException as error:
+            self._error = self._error or error
+
+    def _raise(self) -> None:
+        if self._error is not None:
+            raise self._error
+
+    def write(self, symbol: str, columns: Dict[str, np.ndarray]) -> None:
+        """
+        Queues one batch of rows for `symbol`. Columns are copied first, so
+        the caller may keep appending to the arrays it passed in.
+        """
+        self._raise()
+        if len(columns["time"]):
+            self._queue.put(
+                (symbol, {name: np.array(values) for name, values in columns.items()})
+            )
+
+    def close(self) -> None:
+        """
+        Waits for every queued batch to be written and closes the files.
+        """
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        self._raise()
+
+    async def aclose(self) -> None:
+        await asyncio.to_thread(self.close)
+
+    @abstractmethod
+    def _write(self, symbol: str, columns: Dict[str, np.ndarray]) -> None:
+        pass
+
+    def _close(self) -> None:
+        pass
+
+
+class _FileSink(Sink):
+    # one open writer per symbol, in a directory of files named after it
+
+    extension = ""
+
+    def __init__(self, path: str):
+        os.makedirs(path, exist_ok=True)
+        self._writers: Dict[str, Any] = {}
+        super().__init__(path)
+
+    def _symbol_path(self, symbol: str) -> str:
+        return os.path.join(self.path, f"{_file_name(symbol)}.{self.extension}")
+
+    def _close(self) -> None:
+        for writer in self._writers.values():
+            writer.close()
+        self._writers.clear()
+
+
+class ParquetSink(_FileSink):
+    """
+    One Parquet file per symbol; every batch becomes a row group.
+    """
+
+    extension = "parquet"
+
+    def _write(self, symbol: str, columns: Dict[str, np.ndarray]) -> None:
+        import pyarrow.parquet as pq
+
+        batch = columns_to_arrow(columns)
+        writer = self._writers.get(symbol)
+        if writer is None:
+            writer = pq.ParquetWriter(self._symbol_path(symbol), batch.schema)
+            self._writers[symbol] = writer
+        writer.write_batch(batch)
+
+
+class ArrowSink(_FileSink):
+    """
+    One Arrow IPC file per symbol (Feather v2), one record batch per write.
+    """
+
+    extension = "arrow"
+
+    def _write(self, symbol: str, columns: Dict[str, np.ndarray]) -> None:
+        import pyarrow as pa
+
+        batch = columns_to_arrow(columns)
+        writer = self._writers.get(symbol)
+        if writer is None:
+            writer = pa.ipc.new_file(self._symbol_path(symbol), batch.schema)
+            self._writers[symbol] = writer
+        writer.write_batch(batch)
+
+
+class CsvSink(_FileSink):
+    """
+    One CSV file per symbol, appended to on every write.
+    """
+
+    extension = "csv"
+
+    def _write(self, symbol: str, columns: Dict[str, np.ndarray]) -> None:
+        f = self._writers.get(symbol)
+        header = f is None
+        if f is None:
+            f = open(self._symbol_path(symbol), "w", newline="")
+            self._writers[symbol] = f
+        columns_to_frame(columns).to_csv(f, header=header, index=False)
+
+
+class ExcelSink(Sink):
+    """
+    One sheet per contract in a single workbook, named like the contract
+    code without the slash. Excel files cannot be appended to, so batches
+    are collected on the worker thread and the workbook is written on
+    :meth:`close`; prefer the other sinks for large exports.
+    """
+
+    def __init__(self, path: str):
+        self._frames: Dict[str, list] = {}
+        super().__init__(path)
+
+    def _write(self, symbol: str, columns: Dict[str, np.ndarray]) -> None:
+        self._frames.setdefault(symbol, []).append(columns_to_frame(columns))
+
+    def _close(self) -> None:
+        if not self._frames:
+            return
+        with pd.ExcelWriter(self.path) as writer:
+            for symbol, frames in self._frames.items():
+                pd.concat(frames, ignore_index=True).to_excel(
+                    writer, sheet_name=CONTRACTS.code(symbol).lstrip("/"), index=False
+                )
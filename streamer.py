@@ -3,22 +3,42 @@ import json
 import logging
 import re
 from asyncio import Lock, Queue
-from collections import defaultdict
+from collections import defaultdict, deque
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 from decimal import Decimal
 from enum import Enum
-from typing import AsyncIterator, Dict, List, Optional
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
 
 import websockets
 from pydantic import BaseModel
 
 from dxfeed_clee.candle import Candle
+from dxfeed_clee.columns import (
+    EVENT_SCHEMAS,
+    EventAccumulator,
+    SnapshotTable,
+    columns_to_arrow,
+    items_to_columns,
+)
 from dxfeed_clee.event import Event, EventType
 from dxfeed_clee.quote import Quote
 from dxfeed_clee.summary import Summary
 from dxfeed_clee.timeandsales import TimeAndSale
 from dxfeed_clee.trade import Trade
-from session import ProductionSession, TastytradeError
+from session import Session, TastytradeError
 
 
 class Channel(str, Enum):
@@ -43,6 +63,45 @@ CERT_STREAMER_URL = "wss://streamer.cert.tastyworks.com"
 STREAMER_URL = "wss://streamer.tastyworks.com"
 
 
+def _without_type(item: Dict[str, Any]) -> Dict[str, Any]:
+    return {name: value for name, value in item.items() if name != "eventType"}
+
+
+def _event_order(item: Dict[str, Any]) -> Tuple[int, int]:
+    # by time, or for quotes without an eventTime by the later of bidTime
+    # and askTime, then sequence; (0, 0) for events with no time at all
+    return (
+        item.get("time")
+        or item.get("eventTime")
+        or max(item.get("bidTime") or 0, item.get("askTime") or 0),
+        item.get("sequence") or 0,
+    )
+
+
+def candle_symbol(
+    symbol: str, interval: Optional[str], extended_trading_hours: bool = False
+) -> str:
+    if extended_trading_hours:
+        return f"{symbol}{{={interval},tho=true}}"
+    return f"{symbol}{{={interval}}}"
+
+
+def symbol_key(symbol: str) -> Tuple[str, str]:
+    """
+    Returns what a subscribed symbol and the ``eventSymbol`` the server
+    echoes for it have in common: the symbol before its exchange and the
+    candle period, e.g. ``("/CLZ24", "1d")`` for
+    ``/CLZ24:XNYM{tho=true,=1d}``. The exchange suffix, attribute order
+    and flags such as ``tho`` may be formatted differently.
+    """
+    base, _, attributes = symbol.partition("{")
+    period = ""
+    for attribute in attributes.rstrip("}").split(","):
+        if attribute.startswith("="):
+            period = attribute[1:]
+    return base.split(":")[0], period
+
+
 class QuoteAlert(TastytradeJsonDataclass):
     user_external_id: str
     symbol: str
@@ -58,6 +117,174 @@ class QuoteAlert(TastytradeJsonDataclass):
     dx_symbol: str
 
 
+class FeedContract(str, Enum):
+    """
+    dxLink FEED channel contracts: ``TICKER`` keeps only the last event per
+    symbol, ``STREAM`` delivers every event and ``HISTORY`` also replays
+    time-series snapshots; ``AUTO`` lets the server pick per event type.
+    """
+
+    AUTO = "AUTO"
+    TICKER = "TICKER"
+    STREAM = "STREAM"
+    HISTORY = "HISTORY"
+
+
+@dataclass
+class FeedChannel:
+    #: dxLink channel id
+    id: int
+    event_type: EventType
+    contract: FeedContract = FeedContract.AUTO
+    #: requested server-side conflation period in seconds, None for the
+    #: server default
+    aggregation_period: Optional[float] = None
+    #: whether events go to the per-event-type queues and accumulators
+    #: instead of the channel's own queue
+    default: bool = False
+    state: str = "CHANNEL_CLOSED"
+    #: FEED_CONFIG last sent by the server for this channel
+    config: Dict[str, Any] = field(default_factory=dict)
+    queue: Queue = field(default_factory=Queue)
+
+
+@dataclass
+class StaleFeed:
+    channel: int
+    #: symbol that stopped updating, or None if the whole channel did
+    symbol: Optional[str]
+    #: seconds since its last event
+    silence: float
+
+
+#: what a stale-feed watch does besides signalling
+STALE_ACTIONS = (None, "resubscribe", "reconnect")
+
+EVENT_CLASSES = {
+    EventType.CANDLE: Candle,
+    EventType.QUOTE: Quote,
+    EventType.SUMMARY: Summary,
+    EventType.TIME_AND_SALE: TimeAndSale,
+    EventType.TRADE: Trade,
+}
+
+
+def _subscription_key(item: Dict[str, Any]) -> Tuple[str, str]:
+    return item["type"], item["symbol"]
+
+
+class SubscriptionManager:
+    """
+    Keeps the FEED subscriptions of every channel and only sends what
+    changes: adding an item that is already subscribed with the same
+    parameters, or removing one that is not, costs no message. Changes are
+    split into FEED_SUBSCRIPTION messages of at most `max_batch` items sent
+    `pace` seconds apart, so large universes do not flood the socket.
+    """
+
+    def __init__(
+        self,
+        send: Callable[[Dict[str, Any]], Awaitable[None]],
+        max_batch: int = 500,
+        pace: float = 0.02,
+    ):
+        self._send = send
+        self.max_batch = max_batch
+        self.pace = pace
+        self._items: Dict[int, Dict[Tuple[str, str], Dict[str, Any]]] = defaultdict(
+            dict
+        )
+        self._lock = Lock()
+
+    def subscribed(self, channel: int) -> List[Dict[str, Any]]:
+        return list(self._items.get(channel, {}).values())
+
+    def forget(self, channel: int) -> None:
+        """
+        Drops the state of a channel the server closed or that was cancelled.
+        """
+        self._items.pop(channel, None)
+
+    async def update(
+        self,
+        channel: int,
+        add: Iterable[Dict[str, Any]] = (),
+        remove: Iterable[Dict[str, Any]] = (),
+        reset: bool = False,
+    ) -> Tuple[int, int]:
+        """
+        Applies one change to `channel` and returns how many items were
+        added and removed. With `reset`, `add` is the complete new set and
+        everything else is removed. Removals are sent before additions; a
+        change that fits in one message is applied atomically.
+        """
+        async with self._lock:
+            current = self._items[channel]
+            wanted = {_subscription_key(item): item for item in add}
+            if reset:
+                dropped = [key for key in current if key not in wanted]
+            else:
+                dropped = [
+                    key
+                    for key in dict.fromkeys(map(_subscription_key, remove))
+                    if key in current and key not in wanted
+                ]
+            added = [key for key, item in wanted.items() if current.get(key) != item]
+
+            changes = [("remove", {"symbol": s, "type": t}) for t, s in dropped]
+            changes += [("add", wanted[key]) for key in added]
+            await self._send_changes(channel, changes, self._send)
+
+            for key in dropped:
+                del current[key]
+            for key in added:
+                current[key] = wanted[key]
+            return len(added), len(dropped)
+
+    async def replay(
+        self, channel: int, send: Callable[[Dict[str, Any]], Awaitable[None]]
+    ) -> None:
+        """
+        Sends every item subscribed on `channel` again through `send`, e.g.
+        to another connection.
+        """
+        changes = [("add", item) for item in self.subscribed(channel)]
+        await self._send_changes(channel, changes, send)
+
+    async def _send_changes(
+        self,
+        channel: int,
+        changes: List[Tuple[str, Dict[str, Any]]],
+        send: Callable[[Dict[str, Any]], Awaitable[None]],
+    ) -> None:
+        for i in range(0, len(changes), self.max_batch):
+            if i:
+                await asyncio.sleep(self.pace)
+            message: Dict[str, Any] = {"type": "FEED_SUBSCRIPTION", "channel": channel}
+            for action, item in changes[i : i + self.max_batch]:
+                message.setdefault(action, []).append(item)
+            await send(message)
+
+    async def refresh(self, channel: int, symbols: Iterable[str]) -> None:
+        """
+        Removes and adds `symbols` again with their parameters, so the
+        server restarts their feed and sends a fresh snapshot.
+        """
+        symbols = set(symbols)
+        async with self._lock:
+            items = [
+                item
+                for item in self._items.get(channel, {}).values()
+                if item["symbol"] in symbols
+            ]
+            changes = [
+                ("remove", {"symbol": item["symbol"], "type": item["type"]})
+                for item in items
+            ]
+            changes += [("add", item) for item in items]
+            await self._send_changes(channel, changes, self._send)
+
+
 class SubscriptionType(str, Enum):
     ACCOUNT = "account-subscribe"  # may be 'connect' in the future
     HEARTBEAT = "heartbeat"
@@ -67,27 +294,80 @@ class SubscriptionType(str, Enum):
 
 
 class DXLinkStreamer:
-    def __init__(self, session: ProductionSession):
+    """
+    dxLink websocket client.
+
+    With `standby`, a second connection is opened once the first one is
+    authorized and kept as a hot spare: authenticated, with the same
+    channels open and, if `mirror_subscriptions` is set, the same
+    subscriptions (its data of the last `dedupe_window` seconds is kept
+    aside while the primary is healthy). The primary is pinged every
+    `failover_timeout / 2` seconds; when its socket drops, a ping goes
+    unanswered for `failover_timeout` seconds or nothing arrives on it for
+    `keepalive_timeout` seconds, the spare takes over at once, the events it
+    kept aside are delivered, and a new spare is opened. For
+    `dedupe_window` seconds after the switch, events the old connection
+    already delivered are dropped: those no newer by ``time`` (for quotes,
+    ``bidTime``/``askTime``) and ``sequence``, or with the same payload
+    when they carry no time.
+    """
+
+    def __init__(
+        self,
+        session: Session,
+        standby: bool = False,
+        mirror_subscriptions: bool = True,
+        keepalive_timeout: float = 60,
+        failover_timeout: float = 2.0,
+        dedupe_window: float = 5.0,
+    ):
         self._counter = 0
         self._lock: Lock = Lock()
         self._queues: Dict[EventType, Queue] = defaultdict(Queue)
-        self._channels: Dict[EventType, int] = {
-            EventType.CANDLE: 1,
-            EventType.QUOTE: 7,
-            EventType.SUMMARY: 9,
-            EventType.TIME_AND_SALE: 13,
-            EventType.TRADE: 15,
-        }
-        self._subscription_state: Dict[EventType, str] = defaultdict(
-            lambda: "CHANNEL_CLOSED"
-        )
+        #: open or requested FEED channels by id
+        self._feed_channels: Dict[int, FeedChannel] = {}
+        #: the channel each event type uses unless given another one
+        self._channels: Dict[EventType, int] = {}
+        # client-requested channel ids are odd by dxLink convention
+        self._next_channel = 1
+        self._subscriptions = SubscriptionManager(self._send)
+        self._accumulators: Dict[EventType, EventAccumulator] = {}
+        self._frame_queues: Dict[EventType, Queue] = defaultdict(Queue)
+        self._frame_arrow: Dict[EventType, bool] = {}
 
         self._session = session
         self._authenticated = False
+        self._token_refreshed = False
         self._wss_url = session.dxlink_url
         self._auth_token = session.streamer_token
+        self._keepalive_timeout = keepalive_timeout
+        self._last_received = 0.0
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        self._rtts: Deque[float] = deque(maxlen=64)
+        # stale-feed watch, see watch_feeds()
+        self._watching = False
+        self._event_times: Dict[Tuple[int, str], float] = {}
+        self._channel_times: Dict[int, float] = {}
+        self._stale: Set[Tuple[int, Optional[str]]] = set()
+        self._tasks: Set[asyncio.Task] = set()
+
+        self._standby_enabled = standby
+        self._mirror = mirror_subscriptions
+        self._failover_timeout = failover_timeout
+        self._dedupe_window = dedupe_window
+        self._standby: Any = None
+        self._standby_authenticated = False
+        self._standby_channels: Set[int] = set()
+        #: (arrival, channel, data) of the spare's recent FEED_DATA
+        self._standby_events: Deque[Tuple[float, int, List[Dict[str, Any]]]] = deque()
+        self._dedupe_until = 0.0
+        #: latest order and last item per (channel, event type, symbol), kept
+        #: with a standby to drop replayed events after a switch
+        self._last_events: Dict[Tuple[int, str, str], Tuple[Tuple[int, int], Any]] = {}
+        #: the above as of the switch, for the old connection's events
+        self._old_events: Dict[Tuple[int, str, str], Tuple[Tuple[int, int], Any]] = {}
 
-        self._connect_task = asyncio.create_task(self._connect())
+        self._connect_task = self._start(self._connect())
 
     async def __aenter__(self):
         time_out = 100
@@ -100,73 +380,465 @@ class DXLinkStreamer:
         return self
 
     @classmethod
-    async def create(cls, session: ProductionSession) -> "DXLinkStreamer":
-        self = cls(session)
+    async def create(cls, session: Session, **kwargs) -> "DXLinkStreamer":
+        self = cls(session, **kwargs)
         return await self.__aenter__()
 
     async def __aexit__(self, exc_type, exc, tb):
         await self.close()
 
     async def close(self):
-        self._connect_task.cancel()
-        self._heartbeat_task.cancel()
+        for task in list(self._tasks):
+            task.cancel()
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+
+    def _start(self, coroutine) -> asyncio.Task:
+        task = asyncio.create_task(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    @property
+    def standby_ready(self) -> bool:
+        """
+        Whether a spare connection is authenticated with every channel open.
+        """
+        return (
+            self._standby is not None
+            and self._standby_authenticated
+            and self._standby_channels.issuperset(self._feed_channels)
+        )
 
-    async def _connect(self) -> None:
+    async def _connect(self, standby: bool = False) -> None:
+        if self._session.streamer_token_expired():
+            await asyncio.to_thread(self._session.refresh_streamer_token)
+            self._auth_token = self._session.streamer_token
         async with websockets.connect(self._wss_url) as websocket:  # type: ignore
-            self._websocket = websocket
-            await self._setup_connection()
+            if standby:
+                self._standby = websocket
+                self._standby_authenticated = False
+                self._standby_channels = set()
+            else:
+                self._websocket = websocket
+            await self._setup_connection(websocket)
 
-            while True:
-                raw_message = await self._websocket.recv()
-                message = json.loads(raw_message)
-
-                logging.debug("received: %s", message)
-                if message["type"] == "SETUP":
-                    await self._authenticate_connection()
-                elif message["type"] == "AUTH_STATE":
-                    if message["state"] == "AUTHORIZED":
-                        self._authenticated = True
-                        self._heartbeat_task = asyncio.create_task(self._heartbeat())
-                elif message["type"] == "CHANNEL_OPENED":
-                    channel = next(
-                        k for k, v in self._channels.items() if v == message["channel"]
-                    )
-                    self._subscription_state[channel] = message["type"]
-                elif message["type"] == "CHANNEL_CLOSED":
-                    pass
-                elif message["type"] == "FEED_CONFIG":
-                    pass
-                elif message["type"] == "FEED_DATA":
-                    await self._map_message(message["data"])
-                elif message["type"] == "KEEPALIVE":
-                    pass
-                else:
-                    raise TastytradeError("Unknown message type:", message)
+            try:
+                while True:
+                    raw_message = await websocket.recv()
+                    message = json.loads(raw_message)
+
+                    logging.debug("received: %s", message)
+                    if websocket is self._websocket:
+                        self._last_received = asyncio.get_running_loop().time()
+                        await self._handle_message(message)
+                    elif websocket is self._standby:
+                        await self._handle_standby_message(websocket, message)
+                    else:
+                        return
+            except websockets.ConnectionClosed:
+                if websocket is self._websocket:
+                    if not await self._failover():
+                        raise
+                elif websocket is self._standby:
+                    logging.warning("standby connection lost, reconnecting")
+                    self._standby = None
+                    await asyncio.sleep(1)
+                    self._start(self._connect(standby=True))
+
+    async def _handle_message(self, message: Dict[str, Any]) -> None:
+        if message["type"] == "SETUP":
+            await self._authenticate_connection()
+        elif message["type"] == "AUTH_STATE":
+            if message["state"] == "AUTHORIZED":
+                self._authenticated = True
+                if self._heartbeat_task is None:
+                    self._heartbeat_task = asyncio.create_task(self._heartbeat())
+                    self._start(self._watch_primary())
+                if self._standby_enabled and self._standby is None:
+                    self._start(self._connect(standby=True))
+        elif message["type"] in ("CHANNEL_OPENED", "CHANNEL_CLOSED"):
+            channel = self._feed_channels.get(message["channel"])
+            if channel is not None:
+                channel.state = message["type"]
+            if message["type"] == "CHANNEL_CLOSED":
+                self._subscriptions.forget(message["channel"])
+        elif message["type"] == "FEED_CONFIG":
+            channel = self._feed_channels.get(message["channel"])
+            if channel is not None:
+                channel.config = message
+        elif message["type"] == "FEED_DATA":
+            await self._map_message(message["data"], message["channel"])
+        elif message["type"] == "KEEPALIVE":
+            pass
+        elif (
+            message["type"] == "ERROR"
+            and message.get("error") == "UNAUTHORIZED"
+            and not self._token_refreshed
+        ):
+            # the token was revoked or expired early: get a new one
+            # once and authenticate again on the same connection
+            self._token_refreshed = True
+            await asyncio.to_thread(self._session.refresh_streamer_token)
+            self._auth_token = self._session.streamer_token
+            await self._authenticate_connection()
+        else:
+            raise TastytradeError("Unknown message type:", message)
+
+    async def _handle_standby_message(self, websocket, message: Dict[str, Any]) -> None:
+        # configs and keepalives of the spare are dropped, its data kept
+        # for dedupe_window seconds in case it takes over
+        if message["type"] == "FEED_DATA":
+            now = asyncio.get_running_loop().time()
+            events = self._standby_events
+            events.append((now, message["channel"], message["data"]))
+            while events[0][0] < now - self._dedupe_window:
+                events.popleft()
+        elif message["type"] == "SETUP":
+            await self._authenticate_connection(websocket)
+        elif message["type"] == "AUTH_STATE":
+            if message["state"] == "AUTHORIZED" and not self._standby_authenticated:
+                self._standby_authenticated = True
+                for channel in list(self._feed_channels.values()):
+                    await self._mirror_channel(websocket, channel)
+        elif message["type"] == "CHANNEL_OPENED":
+            self._standby_channels.add(message["channel"])
+        elif message["type"] == "CHANNEL_CLOSED":
+            self._standby_channels.discard(message["channel"])
+        elif message["type"] == "ERROR":
+            logging.warning("standby connection error: %s", message)
+
+    async def _mirror_channel(self, websocket, channel: FeedChannel) -> None:
+        async def send(message: Dict[str, Any]) -> None:
+            await websocket.send(json.dumps(message))
+
+        await send(self._channel_request_message(channel))
+        if channel.aggregation_period is not None:
+            await send(self._feed_setup_message(channel))
+        if self._mirror:
+            await self._subscriptions.replay(channel.id, send)
 
-    async def _setup_connection(self):
+    async def _send_standby(self, message: Dict[str, Any]) -> None:
+        if self._standby is None or not self._standby_authenticated:
+            return
+        try:
+            await self._standby.send(json.dumps(message))
+        except websockets.ConnectionClosed:
+            pass
+
+    @property
+    def ping_rtt(self) -> Optional[float]:
+        """
+        Seconds between the last websocket ping of the primary connection
+        and its pong, or None before the first one.
+        """
+        return self._rtts[-1] if self._rtts else None
+
+    @property
+    def ping_rtts(self) -> List[float]:
+        """
+        The recent ping round trips, oldest first.
+        """
+        return list(self._rtts)
+
+    async def reconnect(self) -> None:
+        """
+        Moves the stream to another connection: the standby if there is
+        one, otherwise a new connection that is authenticated, given the
+        same channels and subscriptions, and then swapped in.
+        """
+        if self._standby is None:
+            self._start(self._connect(standby=True))
+        time_out = 100
+        while not self.standby_ready:
+            await asyncio.sleep(0.1)
+            time_out -= 1
+            if time_out < 0:
+                raise TastytradeError("Connection timed out")
+        await self._failover()
+
+    async def _failover(self) -> bool:
+        standby = self._standby
+        if standby is None or not self._standby_authenticated:
+            return False
+        logging.warning("switching to the standby connection")
+        old, self._websocket = self._websocket, standby
+        self._standby = None
+        self._standby_authenticated = False
+        now = asyncio.get_running_loop().time()
+        self._last_received = now
+        self._dedupe_until = now + self._dedupe_window
+        self._old_events, self._last_events = self._last_events, {}
+        # events that reached the spare while the primary was failing;
+        # untimed ones up to the last the old connection also delivered are
+        # repeats, timed ones are checked by _seen
+        events, self._standby_events = self._standby_events, deque()
+        delivered: Dict[Tuple[int, str, str], Tuple[int, int]] = {}
+        for i, (_, channel, data) in enumerate(events):
+            for j, item in enumerate(data):
+                key = (channel, item["eventType"], item["eventSymbol"])
+                last = self._old_events.get(key)
+                if last is not None and last[1] == _without_type(item):
+                    delivered[key] = (i, j)
+        for i, (_, channel, data) in enumerate(events):
+            fresh = [
+                item
+                for j, item in enumerate(data)
+                if _event_order(item)[0]
+                or delivered.get(
+                    (channel, item["eventType"], item["eventSymbol"]), (-1, -1)
+                )
+                < (i, j)
+            ]
+            if fresh:
+                await self._map_message(fresh, channel, replay=True)
+        if not self._mirror:
+            for channel in list(self._feed_channels):
+                await self._subscriptions.replay(channel, self._send_primary)
+        if self._standby_enabled:
+            self._start(self._connect(standby=True))
+        self._start(old.close())
+        return True
+
+    async def _setup_connection(self, websocket=None):
         message = {
             "type": "SETUP",
             "channel": 0,
             "keepaliveTimeout": 60,
-            "acceptKeepaliveTimeout": 60,
+            "acceptKeepaliveTimeout": self._keepalive_timeout,
             "version": "0.1-js/1.0.0",
         }
-        await self._websocket.send(json.dumps(message))
+        await (websocket or self._websocket).send(json.dumps(message))
 
-    async def _authenticate_connection(self):
+    async def _authenticate_connection(self, websocket=None):
         message = {
             "type": "AUTH",
             "channel": 0,
             "token": self._auth_token,
         }
-        await self._websocket.send(json.dumps(message))
+        await (websocket or self._websocket).send(json.dumps(message))
+
+    async def listen(
+        self, event_type: EventType, channel: Optional[int] = None
+    ) -> AsyncIterator[Event]:
+        """
+        Yields the events of `event_type`, or those of one channel opened
+        with :meth:`open_channel` if `channel` is given.
+        """
+        queue = self._queue(event_type, channel)
+        while True:
+            yield await queue.get()
+
+    async def get_event(
+        self, event_type: EventType, channel: Optional[int] = None
+    ) -> Event:
+        return await self._queue(event_type, channel).get()
+
+    def _queue(self, event_type: EventType, channel: Optional[int]) -> Queue:
+        if channel is None or self._feed_channels[channel].default:
+            return self._queues[event_type]
+        return self._feed_channels[channel].queue
+
+    def listen_frames(
+        self, event_type: EventType, as_arrow: bool = False
+    ) -> AsyncIterator[Any]:
+        """
+        Switches `event_type` to columnar mode and yields one batch per
+        FEED_DATA frame instead of one :class:`Event` per tick. A batch is a
+        dict of NumPy arrays keyed by field name, or a pyarrow RecordBatch if
+        `as_arrow` is set. The mode is active as soon as this is called, so
+        no frame is lost between subscribing and iterating.
+        """
+        if event_type not in EVENT_SCHEMAS:
+            raise TastytradeError(f"No columnar schema for {event_type}")
+        self._frame_arrow[event_type] = as_arrow
+        return self._iter_frames(event_type)
+
+    async def _iter_frames(self, event_type: EventType) -> AsyncIterator[Any]:
+        try:
+            while True:
+                yield await self._frame_queues[event_type].get()
+        finally:
+            self._frame_arrow.pop(event_type, None)
+
+    def attach_accumulator(
+        self, event_type: EventType, accumulator: EventAccumulator
+    ) -> None:
+        """
+        Routes every event of `event_type` straight from the decoded message
+        into `accumulator` instead of building an :class:`Event` and putting
+        it on the queue.
+        """
+        self._accumulators[event_type] = accumulator
+
+    def detach_accumulator(self, event_type: EventType) -> None:
+        self._accumulators.pop(event_type, None)
+
+    async def snapshot(
+        self,
+        event_type: EventType,
+        symbols: List[str],
+        timeout: float = 1.0,
+        unsubscribe: bool = True,
+    ) -> SnapshotTable:
+        """
+        Subscribes `symbols` and returns the first event of each as a
+        :class:`~dxfeed_clee.columns.SnapshotTable`, as soon as every
+        symbol has one or when `timeout` seconds have passed, whichever
+        comes first; :attr:`~dxfeed_clee.columns.SnapshotTable.missing`
+        lists the symbols that did not send anything by then.
+
+        Symbols this call subscribed are unsubscribed again if
+        `unsubscribe` is set. Symbols that were already subscribed only
+        fill on their next event, and an accumulator attached for
+        `event_type` does not receive events while the snapshot runs.
+        """
+        if event_type not in EVENT_SCHEMAS:
+            raise TastytradeError(f"No columnar schema for {event_type}")
+        deadline = asyncio.get_running_loop().time() + timeout
+        done = asyncio.Event()
+        table = SnapshotTable(EVENT_SCHEMAS[event_type], symbols, done.set)
+        previous = self._accumulators.get(event_type)
+        subscribed = set(self.subscriptions(event_type))
+        self.attach_accumulator(event_type, table)
+        try:
+            await self.subscribe(event_type, table.symbols)
+            if not table.complete:
+                remaining = deadline - asyncio.get_running_loop().time()
+                try:
+                    await asyncio.wait_for(done.wait(), max(remaining, 0))
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            if previous is not None:
+                self.attach_accumulator(event_type, previous)
+            else:
+                self.detach_accumulator(event_type)
+        if unsubscribe:
+            added = [symbol for symbol in table.symbols if symbol not in subscribed]
+            if added:
+                await self.unsubscribe(event_type, added)
+        return table
+
+    def watch_feeds(
+        self,
+        on_stale: Optional[Callable[[StaleFeed], Any]] = None,
+        symbol_timeout: Optional[float] = None,
+        channel_timeout: Optional[float] = None,
+        action: Optional[str] = None,
+    ) -> None:
+        """
+        Starts tracking the time since the last event of every subscribed
+        symbol and of every channel, and signals a :class:`StaleFeed` when a
+        symbol is quiet for `symbol_timeout` seconds or a whole channel for
+        `channel_timeout`. Each stale feed is logged and passed to
+        `on_stale` (a function or coroutine function) once, until it
+        updates again. With `action`, stale feeds are also resubscribed
+        (``resubscribe``), or a stale channel moves the stream to another
+        connection (``reconnect``, see :meth:`reconnect`).
+        """
+        if action not in STALE_ACTIONS:
+            raise TastytradeError(f"Unknown stale-feed action: {action}")
+        timeouts = [t for t in (symbol_timeout, channel_timeout) if t is not None]
+        if not timeouts:
+            raise TastytradeError("No stale-feed timeout given")
+        self._watching = True
+        self._start(
+            self._watch_feeds(
+                on_stale, symbol_timeout, channel_timeout, action, min(timeouts) / 4
+            )
+        )
+
+    def event_ages(self, channel: int) -> Dict[str, float]:
+        """
+        Returns the seconds since the last event of every symbol of
+        `channel` seen while feeds are watched.
+        """
+        now = asyncio.get_running_loop().time()
+        return {
+            symbol: now - last
+            for (symbol_channel, symbol), last in self._event_times.items()
+            if symbol_channel == channel
+        }
 
-    async def listen(self, event_type: EventType) -> AsyncIterator[Event]:
+    def channel_age(self, channel: int) -> Optional[float]:
+        last = self._channel_times.get(channel)
+        return None if last is None else asyncio.get_running_loop().time() - last
+
+    async def _watch_feeds(
+        self,
+        on_stale: Optional[Callable[[StaleFeed], Any]],
+        symbol_timeout: Optional[float],
+        channel_timeout: Optional[float],
+        action: Optional[str],
+        interval: float,
+    ) -> None:
         while True:
-            yield await self._queues[event_type].get()
+            await asyncio.sleep(interval)
+            stale = self._stale_feeds(symbol_timeout, channel_timeout)
+            for feed in stale:
+                logging.warning("stale feed: %s", feed)
+                if on_stale is not None:
+                    try:
+                        result = on_stale(feed)
+                        if asyncio.iscoroutine(result):
+                            await result
+                    except Exception:
+                        logging.exception("stale-feed callback failed for %s", feed)
+            try:
+                if action == "reconnect" and any(f.symbol is None for f in stale):
+                    await self.reconnect()
+                elif action is not None:
+                    refresh: Dict[int, List[str]] = defaultdict(list)
+                    for feed in stale:
+                        refresh[feed.channel].extend(
+                            [feed.symbol]
+                            if feed.symbol
+                            else self._subscribed(feed.channel)
+                        )
+                    for channel, symbols in refresh.items():
+                        await self._subscriptions.refresh(channel, symbols)
+            except Exception:
+                logging.exception("stale-feed %s failed", action)
+
+    def _subscribed(self, channel: int) -> List[str]:
+        return [item["symbol"] for item in self._subscriptions.subscribed(channel)]
+
+    def _stale_feeds(
+        self, symbol_timeout: Optional[float], channel_timeout: Optional[float]
+    ) -> List[StaleFeed]:
+        # feeds never seen are timed from the first check that sees them
+        now = asyncio.get_running_loop().time()
+        checks = []
+        for channel in list(self._feed_channels):
+            symbols = self._subscribed(channel)
+            if not symbols:
+                continue
+            if channel_timeout is not None:
+                last = self._channel_times.setdefault(channel, now)
+                checks.append((channel, None, now - last, channel_timeout))
+            if symbol_timeout is not None:
+                # events are keyed by the eventSymbol the server sent back
+                keys = {symbol_key(symbol): symbol for symbol in symbols}
+                latest: Dict[str, float] = {}
+                for (event_channel, event_symbol), last in self._event_times.items():
+                    symbol = keys.get(symbol_key(event_symbol))
+                    if event_channel == channel and symbol is not None:
+                        latest[symbol] = max(last, latest.get(symbol, last))
+                for symbol in symbols:
+                    last = latest.get(symbol) or self._event_times.setdefault(
+                        (channel, symbol), now
+                    )
+                    checks.append((channel, symbol, now - last, symbol_timeout))
 
-    async def get_event(self, event_type: EventType) -> Event:
-        return await self._queues[event_type].get()
+        stale = []
+        for channel, symbol, silence, timeout in checks:
+            if silence <= timeout:
+                self._stale.discard((channel, symbol))
+            elif (channel, symbol) not in self._stale:
+                self._stale.add((channel, symbol))
+                stale.append(StaleFeed(channel, symbol, silence))
+        return stale
 
     async def _heartbeat(self) -> None:
         message = {"type": "KEEPALIVE", "channel": 0}
@@ -174,58 +846,202 @@ class DXLinkStreamer:
         while True:
             logging.debug("sending keepalive message: %s", message)
             await self._websocket.send(json.dumps(message))
-            await asyncio.sleep(30)
+            await self._send_standby(message)
+            await asyncio.sleep(min(30, self._keepalive_timeout / 2))
 
-    async def subscribe(self, event_type: EventType, symbols: List[str]) -> None:
-        if self._subscription_state[event_type] != "CHANNEL_OPENED":
-            await self._channel_request(event_type)
-        message = {
-            "type": "FEED_SUBSCRIPTION",
-            "channel": self._channels[event_type],
-            "add": [{"symbol": symbol, "type": event_type} for symbol in symbols],
-        }
-        logging.debug("sending subscription: %s", message)
-        await self._websocket.send(json.dumps(message))
+    async def _watch_primary(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self._failover_timeout / 2)
+            websocket = self._websocket
+            try:
+                sent = loop.time()
+                pong = await websocket.ping()
+                await asyncio.wait_for(pong, self._failover_timeout)
+                self._rtts.append(loop.time() - sent)
+                healthy = loop.time() - self._last_received <= self._keepalive_timeout
+            except (asyncio.TimeoutError, websockets.ConnectionClosed):
+                healthy = False
+            if not healthy and self._standby_enabled and websocket is self._websocket:
+                await self._failover()
 
-    async def cancel_channel(self, event_type: EventType) -> None:
-        message = {
-            "type": "CHANNEL_CANCEL",
-            "channel": self._channels[event_type],
-        }
-        logging.debug("sending channel cancel: %s", message)
+    async def open_channel(
+        self,
+        event_type: EventType,
+        contract: FeedContract = FeedContract.AUTO,
+        aggregation_period: Optional[float] = None,
+        default: bool = False,
+    ) -> int:
+        """
+        Opens a new FEED channel for `event_type` and returns its id.
+
+        Every channel has its own `contract` and, if `aggregation_period`
+        (seconds) is given, asks the server to conflate its events to at
+        most one per symbol and period, so a slow dashboard channel and an
+        unconflated one for execution can run side by side. Events of a
+        channel are read with ``listen(event_type, channel=...)``; a
+        `default` channel instead becomes the one :meth:`subscribe` and
+        :meth:`listen` use for `event_type`.
+        """
+        channel = FeedChannel(
+            id=self._next_channel,
+            event_type=event_type,
+            contract=FeedContract(contract),
+            aggregation_period=aggregation_period,
+            default=default,
+        )
+        self._next_channel += 2
+        self._feed_channels[channel.id] = channel
+        message = self._channel_request_message(channel)
+        logging.debug("sending channel request: %s", message)
         await self._websocket.send(json.dumps(message))
+        await self._send_standby(message)
+        time_out = 100
+        while channel.state != "CHANNEL_OPENED":
+            await asyncio.sleep(0.1)
+            time_out -= 1
+            if time_out <= 0:
+                del self._feed_channels[channel.id]
+                raise TastytradeError("Subscription channel not opened")
 
-    async def _channel_request(self, event_type: EventType) -> None:
-        message = {
+        if aggregation_period is not None:
+            message = self._feed_setup_message(channel)
+            logging.debug("sending feed setup: %s", message)
+            await self._websocket.send(json.dumps(message))
+            await self._send_standby(message)
+        if default:
+            self._channels[event_type] = channel.id
+        return channel.id
+
+    @staticmethod
+    def _channel_request_message(channel: FeedChannel) -> Dict[str, Any]:
+        return {
             "type": "CHANNEL_REQUEST",
-            "channel": self._channels[event_type],
+            "channel": channel.id,
             "service": "FEED",
             "parameters": {
-                "contract": "AUTO",
+                "contract": channel.contract.value,
             },
         }
+
+    @staticmethod
+    def _feed_setup_message(channel: FeedChannel) -> Dict[str, Any]:
+        return {
+            "type": "FEED_SETUP",
+            "channel": channel.id,
+            "acceptAggregationPeriod": channel.aggregation_period,
+            "acceptDataFormat": "FULL",
+        }
+
+    def channels(self, event_type: Optional[EventType] = None) -> List[FeedChannel]:
+        return [
+            channel
+            for channel in self._feed_channels.values()
+            if event_type is None or channel.event_type == event_type
+        ]
+
+    async def _channel(self, event_type: EventType, channel: Optional[int]) -> int:
+        if channel is not None:
+            return channel
+        async with self._lock:
+            channel = self._channels.get(event_type)
+            if (
+                channel is None
+                or self._feed_channels[channel].state != "CHANNEL_OPENED"
+            ):
+                channel = await self.open_channel(event_type, default=True)
+        return channel
+
+    async def _send(self, message: Dict[str, Any]) -> None:
+        await self._send_primary(message)
+        if self._mirror:
+            await self._send_standby(message)
+
+    async def _send_primary(self, message: Dict[str, Any]) -> None:
         logging.debug("sending subscription: %s", message)
         await self._websocket.send(json.dumps(message))
-        time_out = 100
-        while not self._subscription_state[event_type] == "CHANNEL_OPENED":
-            await asyncio.sleep(0.1)
-            time_out -= 1
-            if time_out <= 0:
-                raise TastytradeError("Subscription channel not opened")
 
-    async def unsubscribe(self, event_type: EventType, symbols: List[str]) -> None:
-        if not self._authenticated:
-            raise TastytradeError("Stream not authenticated")
-        event_type_str = str(event_type).split(".")[1].capitalize()
-        message = {
-            "type": "FEED_SUBSCRIPTION",
-            "channel": self._channels[event_type],
-            "remove": [
-                {"symbol": symbol, "type": event_type_str} for symbol in symbols
+    async def subscribe(
+        self,
+        event_type: EventType,
+        symbols: List[str],
+        channel: Optional[int] = None,
+    ) -> None:
+        channel = await self._channel(event_type, channel)
+        await self._subscriptions.update(
+            channel,
+            add=[{"symbol": symbol, "type": event_type.value} for symbol in symbols],
+        )
+
+    async def set_subscriptions(
+        self,
+        event_type: EventType,
+        symbols: List[str],
+        channel: Optional[int] = None,
+        from_time: Optional[datetime] = None,
+    ) -> Tuple[int, int]:
+        """
+        Makes `symbols` the complete subscription of the channel, sending
+        only the symbols to add and to remove, and returns how many of each
+        there were. Candle symbols are given in full (see
+        :func:`candle_symbol`) and subscribed from `from_time` if set.
+        """
+        channel = await self._channel(event_type, channel)
+        extra = {"fromTime": int(from_time.timestamp() * 1000)} if from_time else {}
+        return await self._subscriptions.update(
+            channel,
+            add=[
+                {"symbol": symbol, "type": event_type.value, **extra}
+                for symbol in symbols
             ],
+            reset=True,
+        )
+
+    def subscriptions(
+        self, event_type: EventType, channel: Optional[int] = None
+    ) -> List[str]:
+        """
+        Returns the symbols currently subscribed for `event_type`.
+        """
+        if channel is None:
+            channel = self._channels.get(event_type)
+        return [
+            item["symbol"]
+            for item in self._subscriptions.subscribed(channel)
+            if item["type"] == event_type.value
+        ]
+
+    async def cancel_channel(
+        self, event_type: EventType, channel: Optional[int] = None
+    ) -> None:
+        channel = channel if channel is not None else self._channels.get(event_type)
+        if channel is None:
+            return
+        message = {
+            "type": "CHANNEL_CANCEL",
+            "channel": channel,
         }
-        logging.debug("sending subscription: %s", message)
+        logging.debug("sending channel cancel: %s", message)
         await self._websocket.send(json.dumps(message))
+        await self._send_standby(message)
+        self._feed_channels.pop(channel, None)
+        self._subscriptions.forget(channel)
+        if self._channels.get(event_type) == channel:
+            del self._channels[event_type]
+
+    async def unsubscribe(
+        self,
+        event_type: EventType,
+        symbols: List[str],
+        channel: Optional[int] = None,
+    ) -> None:
+        if not self._authenticated:
+            raise TastytradeError("Stream not authenticated")
+        channel = await self._channel(event_type, channel)
+        await self._subscriptions.update(
+            channel,
+            remove=[{"symbol": symbol, "type": event_type.value} for symbol in symbols],
+        )
 
     async def subscribe_candle(
         self,
@@ -233,92 +1049,118 @@ class DXLinkStreamer:
         interval: str,
         start_time: datetime,
         extended_trading_hours: bool = False,
+        channel: Optional[int] = None,
     ) -> None:
-        await self._channel_request(EventType.CANDLE)
-
-        message = {
-            "type": "FEED_SUBSCRIPTION",
-            "channel": self._channels[EventType.CANDLE],
-            "add": [
+        channel = await self._channel(EventType.CANDLE, channel)
+        await self._subscriptions.update(
+            channel,
+            add=[
                 {
-                    "symbol": (
-                        f"{ticker}{{={interval},tho=true}}"
-                        if extended_trading_hours
-                        else f"{ticker}{{={interval}}}"
-                    ),
+                    "symbol": candle_symbol(ticker, interval, extended_trading_hours),
                     "type": "Candle",
                     "fromTime": int(start_time.timestamp() * 1000),
                 }
                 for ticker in symbols
             ],
-        }
-
-        await self._websocket.send(json.dumps(message))
+        )
 
     async def unsubscribe_candle(
         self,
         symbols: List[str],
         interval: Optional[str] = None,
         extended_trading_hours: bool = False,
+        channel: Optional[int] = None,
     ) -> None:
-        await self._channel_request(EventType.CANDLE)
-        message = {
-            "type": "FEED_SUBSCRIPTION",
-            "channel": self._channels[EventType.CANDLE],
-            "remove": [
+        channel = await self._channel(EventType.CANDLE, channel)
+        await self._subscriptions.update(
+            channel,
+            remove=[
                 {
-                    "symbol": (
-                        f"{ticker}{{={interval},tho=true}}"
-                        if extended_trading_hours
-                        else f"{ticker}{{={interval}}}"
-                    ),
+                    "symbol": candle_symbol(ticker, interval, extended_trading_hours),
                     "type": "Candle",
                 }
                 for ticker in symbols
             ],
-        }
-        await self._websocket.send(json.dumps(message))
+        )
 
     async def subscribe_quote(
         self,
         symbols: List[str],
+        channel: Optional[int] = None,
     ) -> None:
-        await self._channel_request(EventType.QUOTE)
-        message = {
-            "type": "FEED_SUBSCRIPTION",
-            "channel": 1,
-            "add": [
-                {
-                    "symbol": ticker,
-                    "type": "Quote",
-                }
-                for ticker in symbols
-            ],
-        }
-        await self._websocket.send(json.dumps(message))
+        await self.subscribe(EventType.QUOTE, symbols, channel)
 
     async def unsubscribe_quote(
         self,
         symbols: List[str],
+        channel: Optional[int] = None,
     ) -> None:
-        await self._channel_request(EventType.QUOTE)
-        message = {
-            "type": "FEED_SUBSCRIPTION",
-            "channel": 1,
-            "remove": [
-                {
-                    "symbol": ticker,
-                    "type": "Quote",
-                }
-                for ticker in symbols
-            ],
-        }
-        await self._websocket.send(json.dumps(message))
+        await self.unsubscribe(EventType.QUOTE, symbols, channel)
 
-    async def _map_message(self, message) -> None:
+    def _seen(
+        self,
+        channel: Optional[int],
+        msg_type: str,
+        item: Dict,
+        dedupe: bool,
+        replay: bool = False,
+    ) -> bool:
+        # events with no time at all are compared by payload. Once a symbol
+        # gets past the old connection's last event it is no longer checked,
+        # so identical repeats from then on are kept
+        key = (channel, msg_type, item["eventSymbol"])
+        order = _event_order(item)
+        last = self._old_events.get(key) if dedupe else None
+        if last is not None:
+            last_order, last_item = last
+            if order[0] and last_order[0]:
+                if order < last_order or (
+                    order == last_order and (replay or item == last_item)
+                ):
+                    return True
+            elif not order[0] and item == last_item:
+                return True
+            del self._old_events[key]
+        # keep the latest order even when the latest event has no time
+        previous = self._last_events.get(key)
+        if not order[0] and previous is not None:
+            order = previous[0]
+        self._last_events[key] = (order, item)
+        return False
+
+    async def _map_message(
+        self, message, channel: Optional[int] = None, replay: bool = False
+    ) -> None:
+        if self._watching:
+            now = asyncio.get_running_loop().time()
+            self._channel_times[channel] = now
+            for item in message:
+                self._event_times[(channel, item["eventSymbol"])] = now
+        seen = self._standby_enabled
+        dedupe = seen and asyncio.get_running_loop().time() < self._dedupe_until
+        feed = self._feed_channels.get(channel)
+        if feed is not None and not feed.default:
+            for item in message:
+                msg_type = item.pop("eventType")
+                if seen and self._seen(channel, msg_type, item, dedupe, replay):
+                    continue
+                if msg_type not in EVENT_CLASSES:
+                    raise TastytradeError(f"Unknown message type: {message}")
+                await feed.queue.put(EVENT_CLASSES[msg_type](**item))
+            return
+
+        frames: Dict[EventType, List[Dict[str, Any]]] = defaultdict(list)
         for item in message:
             msg_type = item.pop("eventType")
-            if msg_type == EventType.CANDLE:
+            if seen and self._seen(channel, msg_type, item, dedupe, replay):
+                continue
+            if msg_type in self._frame_arrow:
+                frames[msg_type].append(item)
+                continue
+            accumulator = self._accumulators.get(msg_type)
+            if accumulator is not None:
+                accumulator.append(item)
+            elif msg_type == EventType.CANDLE:
                 await self._queues[EventType.CANDLE].put(Candle(**item))
             elif msg_type == EventType.QUOTE:
                 await self._queues[EventType.QUOTE].put(Quote(**item))
@@ -331,3 +1173,10 @@ class DXLinkStreamer:
                 await self._queues[EventType.TRADE].put(Trade(**item))
             else:
                 raise TastytradeError(f"Unknown message type: {message}")
+
+        for msg_type, items in frames.items():
+            columns = items_to_columns(items, EVENT_SCHEMAS[msg_type])
+            if self._frame_arrow[msg_type]:
+                await self._frame_queues[msg_type].put(columns_to_arrow(columns))
+            else:
+                await self._frame_queues[msg_type].put(columns)
@@ -0,0 +1,41 @@
+import io
+import json
+
+import pytest
+
+import rest_history
+from dxfeed_clee.event import EventType
+from rest_history import RestHistory
+
+BODY = {
+    "Candle": {
+        "BRK.B{=1d}": [{"time": 1, "close": 1.5}, {"time": 2, "close": 2.5}],
+        "BRK{=1d}": [{"time": 3, "close": 3.5}],
+    }
+}
+
+
+class FakeResponse:
+    def __init__(self, body):
+        self.raw = io.BytesIO(json.dumps(body).encode())
+
+    def json(self):
+        return json.loads(self.raw.getvalue())
+
+
+def iter_items(event_symbol):
+    history = RestHistory.__new__(RestHistory)
+    return list(
+        history._iter_items(FakeResponse(BODY), EventType.CANDLE, event_symbol)
+    )
+
+
+def test_dotted_symbol_streamed():
+    pytest.importorskip("ijson")
+    assert iter_items("BRK.B{=1d}") == BODY["Candle"]["BRK.B{=1d}"]
+    assert iter_items("BRK{=1d}") == BODY["Candle"]["BRK{=1d}"]
+
+
+def test_dotted_symbol_parsed_whole(monkeypatch):
+    monkeypatch.setattr(rest_history, "ijson", None)
+    assert iter_items("BRK.B{=1d}") == BODY["Candle"]["BRK.B{=1d}"]
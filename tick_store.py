@@ -0,0 +1,268 @@
+import asyncio
+import os
+import queue
+import re
+import threading
+from datetime import date, datetime
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+
+from dxfeed_clee.columns import EVENT_SCHEMAS, EventAccumulator
+from dxfeed_clee.event import EventType
+from dxfeed_clee.timeandsales import TimeAndSale
+from dxfeed_clee.trade import Trade
+from session import TastytradeError
+
+MS_PER_DAY = 86_400_000
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+#: one time index entry is kept every `INDEX_STRIDE` rows
+INDEX_STRIDE = 4096
+#: width of the fixed-size byte columns string fields are stored in
+STRING_WIDTH = 16
+
+
+def _tick_schema(event_type: EventType, model) -> Dict[str, np.dtype]:
+    schema = {}
+    for name, dtype in EVENT_SCHEMAS[event_type].items():
+        if name == "eventSymbol" or model.model_fields[name].annotation in (
+            None,
+            type(None),
+        ):
+            continue
+        schema[name] = np.dtype(f"S{STRING_WIDTH}") if dtype.kind == "O" else dtype
+    return schema
+
+
+#: on-disk column dtypes per event type; strings become fixed-width bytes
+TICK_SCHEMAS: Dict[EventType, Dict[str, np.dtype]] = {
+    EventType.TIME_AND_SALE: _tick_schema(EventType.TIME_AND_SALE, TimeAndSale),
+    EventType.TRADE: _tick_schema(EventType.TRADE, Trade),
+}
+
+
+def _read_count(path: str) -> int:
+    try:
+        with open(path, "rb") as f:
+            return int(np.frombuffer(f.read(8), dtype=np.int64)[0])
+    except (FileNotFoundError, IndexError):
+        return 0
+
+
+def _write_count(path: str, count: int) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(np.int64(count).tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _map_column(path: str, dtype: np.dtype, count: int) -> np.ndarray:
+    if count == 0:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", shape=(count,))
+
+
+class TickStore:
+    """
+    Append-only store of TimeAndSale and Trade ticks with one raw binary
+    file per field, per symbol and per UTC day::
+
+        root/<event type>/<symbol>/<YYYY-MM-DD>/<field>.bin
+
+    Each day directory also holds ``count`` (rows committed so far, replaced
+    atomically after the columns are appended, so a crash never exposes a
+    torn row) and ``time.idx``, the tick time of every
+    :data:`INDEX_STRIDE`-th row. Reads memory-map the files and return
+    views, so nothing is parsed or copied.
+    """
+
+    def __init__(self, root: str):
+        #: directory holding one sub-directory per event type
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _day_dir(self, event_type: EventType, symbol: str, day: date) -> str:
+        name = re.sub(r"[^A-Za-z0-9._-]", "_", symbol.lstrip("/"))
+        return os.path.join(self.root, event_type.value, name, day.isoformat())
+
+    def _schema(self, event_type: EventType) -> Dict[str, np.dtype]:
+        if event_type not in TICK_SCHEMAS:
+            raise TastytradeError(f"Ticks of type {event_type} cannot be stored")
+        return TICK_SCHEMAS[event_type]
+
+    def writer(self, event_type: EventType, flush_size: int = 8192) -> "TickWriter":
+        return TickWriter(self, event_type, flush_size)
+
+    def append(
+        self, event_type: EventType, symbol: str, columns: Dict[str, np.ndarray]
+    ) -> None:
+        """
+        Appends columns of ticks for `symbol`, splitting them by UTC day.
+        """
+        schema = self._schema(event_type)
+        days = columns["time"] // MS_PER_DAY
+        for day in np.unique(days):
+            rows = np.flatnonzero(days == day)
+            day_dir = self._day_dir(
+                event_type, symbol, date.fromordinal(int(day) + EPOCH_ORDINAL)
+            )
+            os.makedirs(day_dir, exist_ok=True)
+            count_path = os.path.join(day_dir, "count")
+            count = _read_count(count_path)
+            for name, dtype in schema.items():
+                path = os.path.join(day_dir, f"{name}.bin")
+                with open(path, "r+b" if os.path.exists(path) else "wb") as f:
+                    # drop anything past the committed count left by a crash
+                    f.truncate(count * dtype.itemsize)
+                    f.seek(0, os.SEEK_END)
+                    f.write(np.ascontiguousarray(columns[name][rows], dtype).tobytes())
+                    f.flush()
+                    os.fsync(f.fileno())
+
+            times = columns["time"][rows]
+            first = -count % INDEX_STRIDE
+            index_path = os.path.join(day_dir, "time.idx")
+            with open(index_path, "r+b" if os.path.exists(index_path) else "wb") as f:
+                f.truncate(-(-count // INDEX_STRIDE) * 8)
+                f.seek(0, os.SEEK_END)
+                f.write(times[first::INDEX_STRIDE].astype(np.int64).tobytes())
+            _write_count(count_path, count + len(rows))
+
+    def days(self, event_type: EventType, symbol: str) -> List[date]:
+        symbol_dir = os.path.dirname(self._day_dir(event_type, symbol, date.today()))
+        if not os.path.isdir(symbol_dir):
+            return []
+        return sorted(date.fromisoformat(name) for name in os.listdir(symbol_dir))
+
+    def read_day(
+        self,
+        event_type: EventType,
+        symbol: str,
+        day: date,
+        start_ms: Optional[int] = None,
+        end_ms: Optional[int] = None,
+    ) -> Dict[str, np.ndarray]:
+        """
+        Returns memory-mapped views of one day of ticks with
+        ``start_ms <= time < end_ms``. Ticks are expected in time order,
+        which is the order a live feed delivers them in.
+        """
+        schema = self._schema(event_type)
+        day_dir = self._day_dir(event_type, symbol, day)
+        count = _read_count(os.path.join(day_dir, "count"))
+        columns = {
+            name: _map_column(os.path.join(day_dir, f"{name}.bin"), dtype, count)
+            for name, dtype in schema.items()
+        }
+        times = columns["time"]
+        index = _map_column(
+            os.path.join(day_dir, "time.idx"),
+            np.dtype(np.int64),
+            -(-count // INDEX_STRIDE),
+        )
+
+        def locate(bound: Optional[int], default: int) -> int:
+            if bound is None:
+                return default
+            block = max(int(np.searchsorted(index, bound)) - 1, 0)
+            low = block * INDEX_STRIDE
+            high = min(low + 2 * INDEX_STRIDE, count)
+            return low + int(np.searchsorted(times[low:high], bound))
+
+        start, end = locate(start_ms, 0), locate(end_ms, count)
+        return {name: values[start:end] for name, values in columns.items()}
+
+    def read(
+        self,
+        event_type: EventType,
+        symbol: str,
+        start: datetime,
+        end: datetime,
+    ) -> Iterator[Dict[str, np.ndarray]]:
+        """
+        Yields the zero-copy columns of every stored day overlapping
+        ``[start, end)``, one dict per day.
+        """
+        start_ms = int(start.timestamp() * 1000)
+        end_ms = int(end.timestamp() * 1000)
+        for day in self.days(event_type, symbol):
+            day_start = (day.toordinal() - EPOCH_ORDINAL) * MS_PER_DAY
+            if day_start + MS_PER_DAY <= start_ms or day_start >= end_ms:
+                continue
+            columns = self.read_day(event_type, symbol, day, start_ms, end_ms)
+            if len(columns["time"]):
+                yield columns
+
+
+class TickWriter(EventAccumulator):
+    """
+    Buffers ticks straight from :meth:`DXLinkStreamer.attach_accumulator`
+    and hands them to a :class:`TickStore` every `flush_size` ticks. The
+    appends (and their fsyncs) run on a writer thread, so flushing never
+    blocks the event loop or the websocket reader; errors raised there
+    surface on the next :meth:`flush` or on :meth:`close`. Call
+    :meth:`close` after detaching to write what is left.
+    """
+
+    def __init__(self, store: TickStore, event_type: EventType, flush_size: int):
+        super().__init__(store._schema(event_type), capacity=flush_size)
+        self.store = store
+        self.event_type = event_type
+        self.flush_size = flush_size
+        self._pending = 0
+        self._queue: queue.Queue = queue.Queue()
+        self._error: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            job = self._queue.get()
+            if job is None:
+                break
+            if self._error is not None:
+                continue
+            try:
+                self.store.append(self.event_type, *job)
+            except BaseException as error:
+                self._error = error
+
+    def _raise(self) -> None:
+        if self._error is not None:
+            raise self._error
+
+    def append(self, item: Dict) -> None:
+        super().append(item)
+        self._pending += 1
+        if self._pending >= self.flush_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        Queues the buffered ticks for writing and empties the buffers.
+        """
+        self._raise()
+        for symbol in self:
+            columns = self.arrays(symbol)
+            if len(columns["time"]):
+                # copied, since clear() reuses the buffers
+                copy = {name: np.array(values) for name, values in columns.items()}
+                self._queue.put((symbol, copy))
+        self.clear()
+        self._pending = 0
+
+    def close(self) -> None:
+        """
+        Flushes, waits for every queued write to be committed and stops the
+        writer thread.
+        """
+        self.flush()
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        self._raise()
+
+    async def aclose(self) -> None:
+        await asyncio.to_thread(self.close)
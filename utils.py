@@ -1,40 +1,179 @@
 import re
-from datetime import datetime, timedelta
-from typing import List, Optional
+from datetime import date, datetime, timedelta
+from typing import Iterable, Optional, Sequence, Tuple, Union
 
+import numpy as np
 import pandas as pd
 from pytz import timezone as tz
 
 
+MS_PER_DAY = 86_400_000
+
+
+class TradingCalendar:
+    """
+    Decides which days trade and where each day's session sits relative to
+    midnight. The session of trading day ``D`` covers
+    ``[D + session_open, D + session_close)``; a negative `session_open`
+    models sessions that open the evening before, like CME Globex.
+
+    Multi-day periods (weekly bars and the like) start on `week_start`.
+
+    Subclass and override :meth:`is_trading_day` for exchange-specific rules.
+    """
+
+    def __init__(
+        self,
+        closed_weekdays: Sequence[int] = (5,),
+        holidays: Iterable[Union[date, str]] = (),
+        session_open: timedelta = timedelta(0),
+        session_close: timedelta = timedelta(days=1),
+        week_start: int = 0,
+    ):
+        if session_close <= session_open:
+            raise ValueError("session_close must be after session_open")
+        #: weekdays without a session, Monday is 0
+        self.closed_weekdays = tuple(closed_weekdays)
+        #: dates without a session
+        self.holidays = np.array(sorted(holidays), dtype="datetime64[D]")
+        self.session_open = session_open
+        self.session_close = session_close
+        #: weekday multi-day periods are anchored to, Monday is 0
+        self.week_start = week_start
+
+    @property
+    def session_bounds_ms(self) -> Tuple[int, int]:
+        return (
+            self.session_open // timedelta(milliseconds=1),
+            self.session_close // timedelta(milliseconds=1),
+        )
+
+    def is_trading_day(self, days: np.ndarray) -> np.ndarray:
+        # 1970-01-01 was a Thursday, so shift by 3 to make Monday 0
+        weekdays = (days.astype(np.int64) + 3) % 7
+        mask = ~np.isin(weekdays, self.closed_weekdays)
+        if len(self.holidays):
+            mask &= ~np.isin(days, self.holidays)
+        return mask
+
+    def trading_days(self, start_date: date, end_date: date) -> np.ndarray:
+        days = np.arange(
+            np.datetime64(start_date, "D"),
+            np.datetime64(end_date, "D") + 1,
+            dtype="datetime64[D]",
+        )
+        return days[self.is_trading_day(days)]
+
+    def session_ids(self, times: np.ndarray) -> np.ndarray:
+        """
+        Maps naive exchange-time milliseconds to the trading day (as days
+        since epoch) whose session contains them.
+        """
+        open_ms, _ = self.session_bounds_ms
+        return (np.asarray(times, dtype=np.int64) - open_ms) // MS_PER_DAY
+
+    def period_start(self, sessions, days: int):
+        """
+        Returns the first trading day (days since epoch) of the `days` long
+        period every trading day in `sessions` falls in, with periods
+        counted from a :attr:`week_start` rather than from the epoch.
+        """
+        # 1970-01-01 was a Thursday, weekday 3
+        anchor = (self.week_start - 3) % 7
+        return (sessions - anchor) // days * days + anchor
+
+
+#: every day except Saturday, midnight to midnight
+DEFAULT_CALENDAR = TradingCalendar()
+
+#: CME Globex: Sunday-Thursday 17:00 to the next day's 16:00, exchange time
+CME_GLOBEX_CALENDAR = TradingCalendar(
+    closed_weekdays=(5, 6),
+    session_open=timedelta(hours=-7),
+    session_close=timedelta(hours=16),
+)
+
+
 def generate_timestamps(
     start_date: datetime,
     end_date: datetime,
     interval: str,
     from_zone: Optional[tz] = None,
     to_zone: Optional[tz] = None,
-) -> List[float]:
+    calendar: Optional[TradingCalendar] = None,
+) -> np.ndarray:
+    """
+    Returns every bar start between the trading days of `start_date` and
+    `end_date` as a sorted int64 array of naive milliseconds.
+    """
     if from_zone and to_zone:
         start_date = start_date.astimezone(to_zone)
         end_date = end_date.astimezone(to_zone)
+    calendar = calendar or DEFAULT_CALENDAR
 
-    all_days = pd.date_range(start=start_date, end=end_date, freq="D")
-    no_saturdays = all_days[all_days.dayofweek != 5]
-    timestamps = []
-    for day in no_saturdays:
-        start_datetime = pd.Timestamp(day).replace(
-            hour=0, minute=0, second=0, microsecond=0
-        )
-        end_datetime = pd.Timestamp(day).replace(
-            hour=23, minute=59, second=59, microsecond=999999
-        )
-        times = pd.date_range(start=start_datetime, end=end_datetime, freq=interval)
-        timestamps.extend([time.value // 10**6 for time in times])
-
+    days = calendar.trading_days(start_date.date(), end_date.date())
+    step = interval_to_timedelta(interval) // timedelta(milliseconds=1)
+    open_ms, close_ms = calendar.session_bounds_ms
+    offsets = np.arange(open_ms, close_ms, step, dtype=np.int64)
+    timestamps = (days.astype(np.int64) * MS_PER_DAY)[:, None] + offsets
+    timestamps = timestamps.ravel()
+    if close_ms - open_ms > MS_PER_DAY:
+        timestamps = np.unique(timestamps)
     return timestamps
 
 
+def match_timestamps(
+    expected: np.ndarray, times: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Locates `times` in the sorted `expected` array with a binary search.
+
+    Returns the indices of `times` to keep (the first hit of each expected
+    timestamp, in arrival order) and a bitmap over `expected` of the
+    timestamps that were found.
+    """
+    slots = np.searchsorted(expected, times)
+    in_range = slots < len(expected)
+    hit = np.zeros(len(times), dtype=bool)
+    hit[in_range] = expected[slots[in_range]] == times[in_range]
+
+    hit_idx = np.flatnonzero(hit)
+    _, first = np.unique(slots[hit_idx], return_index=True)
+    keep = np.sort(hit_idx[first])
+
+    found = np.zeros(len(expected), dtype=bool)
+    found[slots[keep]] = True
+    return keep, found
+
+
+def match_tz(value: datetime, like: datetime) -> datetime:
+    """
+    Returns `value` as the same instant, naive (local time, as
+    :meth:`datetime.timestamp` reads it) or aware to match `like`, so the
+    two can be compared.
+    """
+    if like.tzinfo is None and value.tzinfo is not None:
+        return value.astimezone().replace(tzinfo=None)
+    if like.tzinfo is not None and value.tzinfo is None:
+        return value.astimezone(like.tzinfo)
+    return value
+
+
+def to_exchange_time(
+    times: np.ndarray, exchange_tz: str = "America/Chicago"
+) -> np.ndarray:
+    """
+    Converts a whole column of UTC epoch milliseconds to the wall-clock time
+    of `exchange_tz`, still expressed as int64 milliseconds (naive), which is
+    the form :func:`generate_timestamps` produces.
+    """
+    utc = pd.to_datetime(np.asarray(times, dtype=np.int64), unit="ms", utc=True)
+    local = utc.tz_convert(exchange_tz).tz_localize(None)
+    return local.as_unit("ms").asi8
+
+
 def interval_to_timedelta(interval_str: str) -> timedelta:
-    match = re.match(r"(\d+)([mhd])", interval_str)
+    match = re.match(r"(\d+)([smhdw])", interval_str)
     if not match:
         raise ValueError("Invalid interval format")
 